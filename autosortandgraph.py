@@ -1,16 +1,775 @@
+import argparse
+import functools
+import glob
+import gzip
+import hashlib
+import heapq
+import io
+import json
+import os
+import pickle
+import queue
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import tkinter as tk
-from tkinter import filedialog, messagebox
-import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+from tkinter import filedialog, messagebox, ttk
 import tkinterdnd2 as tkdnd  # Import tkinterdnd2 for drag-and-drop support
 
+SAMPLE_ROWS = 10_000  # Rows read to sniff the schema of a CSV file
+CATEGORY_RATIO = 0.5  # Text columns with fewer distinct values than this share of rows are stored as categories
+CSV_CHUNK_ROWS = 500_000  # Rows per chunk when the pyarrow CSV engine is not available
+LARGE_FILE_BYTES = 50 * 1024 * 1024  # Files bigger than this ask which columns to load
+SIDECAR_CACHE_BYTES = 2 * 1024 * 1024 * 1024  # Size limit of the converted-file cache directory
+SORT_MEMORY_BUDGET_MB = 512  # Default memory budget of the on-disk sort
+MERGE_FAN_IN = 16  # Sorted runs merged at once; more runs are merged in several passes
+EXCEL_MAX_ROWS = 1_048_576  # Worksheet row limit, header included
+SORT_INDEX_CACHE_SIZE = 8  # Sort orders kept so switching back to one needs no new sort
+EXPORT_CHUNK_ROWS = 50_000  # Rows written between progress updates when saving
+EXPORT_FILETYPES = [("Excel files", "*.xlsx"), ("CSV files", "*.csv"), ("Gzipped CSV files", "*.csv.gz"),
+                    ("Zstandard CSV files", "*.csv.zst"), ("Parquet files", "*.parquet")]
+MAX_CATEGORIES = 30  # Bars, stacked groups or pie wedges drawn before the rest are merged into "Other"
+
+
+def csv_engine():
+    # The pyarrow engine parses CSV on several threads and is much faster than the C engine
+    try:
+        import pyarrow  # noqa: F401
+        return 'pyarrow'
+    except ImportError:
+        return 'c'
+
+
+def is_text(series):
+    # Text may be stored as object, the string dtype or categories of strings
+    import pandas as pd
+    from pandas.api.types import is_string_dtype
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        dtype = dtype.categories.dtype
+    return is_string_dtype(dtype)
+
+
+def read_header(path):
+    # Read only the column names so the user can choose what to load
+    import pandas as pd
+    if path.endswith('.csv'):
+        return list(pd.read_csv(path, nrows=0).columns)
+    return list(pd.read_excel(path, nrows=0).columns)
+
+
+def read_sample(path, columns=None):
+    # The first SAMPLE_ROWS rows, enough to judge each column's type without loading the file
+    import pandas as pd
+    if path.endswith('.csv'):
+        return pd.read_csv(path, nrows=SAMPLE_ROWS, usecols=columns)
+    return pd.read_excel(path, nrows=SAMPLE_ROWS, usecols=columns)
+
+
+def sample_text_columns(path, columns):
+    # Which of the columns hold text, judged from a sample so the file need not be loaded
+    sample = read_sample(path, columns)
+    return [column for column in sample.columns if is_text(sample[column])]
+
+
+def sniff_schema(path, columns=None):
+    # Guess compact dtypes from a sample: repetitive text columns become categories
+    sample = read_sample(path, columns)
+    dtypes = {}
+    for column in sample.columns:
+        values = sample[column]
+        if is_text(values) and len(values) and values.nunique() < len(values) * CATEGORY_RATIO:
+            dtypes[column] = 'category'
+    return dtypes
+
+
+def downcast_numbers(data):
+    # Store integers and floats in the narrowest dtype that keeps every value exact
+    import pandas as pd
+    from pandas.api.types import is_float_dtype, is_integer_dtype
+    for column in data.columns:
+        values = data[column]
+        if is_integer_dtype(values) and not isinstance(values.dtype, pd.CategoricalDtype):
+            data[column] = pd.to_numeric(values, downcast='integer')
+        elif is_float_dtype(values):
+            narrow = values.astype('float32')
+            if ((narrow.astype('float64') == values) | values.isna()).all():
+                data[column] = narrow
+    return data
+
+
+def compact_dtypes(data):
+    # Downcast numbers without losing precision and store repetitive text as categories
+    import pandas as pd
+    data = downcast_numbers(data)
+    for column in data.columns:
+        values = data[column]
+        if is_text(values) and not isinstance(values.dtype, pd.CategoricalDtype):
+            if len(values) and values.nunique() < len(values) * CATEGORY_RATIO:
+                data[column] = values.astype('category')
+    return data
+
+
+def concat_chunks(chunks):
+    # Categories of the sniffed category columns differ from chunk to chunk, so align them
+    # before concatenating; a chunk with no values may not even share their dtype
+    import pandas as pd
+    if len(chunks) == 1:
+        return chunks[0]
+    for column in chunks[0].columns:
+        if isinstance(chunks[0][column].dtype, pd.CategoricalDtype):
+            categories = chunks[0][column].cat.categories
+            for chunk in chunks[1:]:
+                categories = categories.union(chunk[column].cat.categories, sort=False)
+            for chunk in chunks:
+                chunk[column] = chunk[column].cat.set_categories(categories)
+    return pd.concat(chunks, ignore_index=True)
+
+
+class SidecarCache:
+    # Keeps a Feather copy of every loaded spreadsheet so reopening it skips the CSV/XML parsing.
+    # Entries are keyed by the source path and chosen columns; the source size and mtime are
+    # stored alongside, so an edited file invalidates its entry. The least recently used
+    # entries are evicted once the directory grows past max_bytes.
+    def __init__(self, directory=None, max_bytes=SIDECAR_CACHE_BYTES):
+        if directory is None:
+            directory = os.path.join(os.path.expanduser("~"), ".cache", "autosortandgraph")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def entry_path(self, path, columns):
+        key = json.dumps([os.path.abspath(path), columns])
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.feather')
+
+    @staticmethod
+    def source_stamp(path):
+        stat = os.stat(path)
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+    def get(self, path, columns=None):
+        try:
+            import pyarrow.feather as feather
+        except ImportError:
+            return None
+        entry = self.entry_path(path, columns)
+        if not os.path.exists(entry):
+            return None
+        try:
+            # Memory-map the copy so numeric columns are not read through a buffer first
+            table = feather.read_table(entry, memory_map=True)
+            metadata = table.schema.metadata or {}
+            if metadata.get(b'source_stamp', b'').decode() != self.source_stamp(path):
+                self.discard(entry)  # The spreadsheet changed since it was cached
+                return None
+            data = table.to_pandas()
+            os.utime(entry)  # Mark as recently used for eviction
+        except Exception:
+            self.discard(entry)  # Unreadable entry, convert the file again
+            return None
+        return data
+
+    @staticmethod
+    def discard(entry):
+        # Batch workers share the directory, so another process may have removed it already
+        try:
+            os.remove(entry)
+        except FileNotFoundError:
+            pass
+
+    def put(self, path, columns, data):
+        try:
+            import pyarrow as pa
+            import pyarrow.feather as feather
+        except ImportError:
+            return
+        entry = self.entry_path(path, columns)
+        temporary = f"{entry}.{os.getpid()}.tmp"
+        try:
+            table = pa.Table.from_pandas(data, preserve_index=False)
+            metadata = dict(table.schema.metadata or {})
+            metadata[b'source_stamp'] = self.source_stamp(path).encode()
+            # Uncompressed so later loads can memory-map the columns directly
+            feather.write_feather(table.replace_schema_metadata(metadata), temporary, compression='uncompressed')
+            os.replace(temporary, entry)
+        except Exception:
+            # Columns pyarrow cannot store (e.g. mixed-type objects) are simply not cached
+            self.discard(temporary)
+            return
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.feather'):
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self.discard(os.path.join(self.directory, name))
+            total -= size
+
+
+def load_spreadsheet(path, columns=None, cache=None):
+    # Load a CSV or Excel file with compact dtypes, reading only the chosen columns
+    import pandas as pd
+    start = time.perf_counter()
+    data = cache.get(path, columns) if cache else None
+    if data is not None:
+        engine = 'cached feather'
+    elif path.endswith('.csv'):
+        dtypes = sniff_schema(path, columns)
+        engine = csv_engine()
+        if engine == 'pyarrow':
+            data = pd.read_csv(path, engine=engine, usecols=columns, dtype=dtypes)
+        else:
+            # Chunks only get the sniffed dtypes and narrower numbers; whether the other text
+            # columns become categories is decided once the whole file is loaded
+            reader = pd.read_csv(path, usecols=columns, dtype=dtypes, chunksize=CSV_CHUNK_ROWS)
+            data = concat_chunks([downcast_numbers(chunk) for chunk in reader])
+    else:
+        engine = 'excel'
+        data = pd.read_excel(path, usecols=columns)
+    if engine != 'cached feather':
+        data = compact_dtypes(data)
+        if cache:
+            cache.put(path, columns, data)
+    stats = {
+        'rows': len(data),
+        'columns': len(data.columns),
+        'seconds': time.perf_counter() - start,
+        'bytes': int(data.memory_usage(deep=True).sum()),
+        'engine': engine,
+    }
+    return data, stats
+
+
+def describe_load(stats):
+    return (f"Loaded {stats['rows']:,} rows x {stats['columns']} columns in {stats['seconds']:.2f} s "
+            f"({stats['bytes'] / (1024 * 1024):.1f} MB in memory, {stats['engine']} reader)")
+
+
+class Descending:
+    # Inverts the ordering of a sort key so columns with different directions share one merge
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+MISSING_KEY = (1,)  # Missing values sort last in either direction, like sort_values does
+
+
+def fold_text(values):
+    # Case-insensitive sort key; anything that is not a string counts as missing
+    import pandas as pd
+    values = values.astype(object)
+    try:
+        return values.str.casefold()
+    except AttributeError:  # No strings at all
+        return pd.Series(None, index=values.index, dtype=object)
+
+
+def key_values(values, text):
+    # What a column is sorted by: folded text for text columns, otherwise the values, with
+    # stray text in a number column counted as missing so every chunk compares one type
+    import pandas as pd
+    from pandas.api.types import is_string_dtype
+    if text:
+        return fold_text(values)
+    if is_string_dtype(values.dtype):  # Object or str columns, where a chunk met stray text
+        return pd.to_numeric(values, errors='coerce')
+    return values
+
+
+def sort_frame(data, by, ascending, text_columns):
+    # Stable in-memory sort with case-insensitive ordering of the text columns
+    return data.sort_values(by=by, ascending=ascending, kind='stable', na_position='last',
+                            key=lambda col: key_values(col, col.name in text_columns))
+
+
+def rank_codes(values, text):
+    # Dense ranks of a column's values in sort order, -1 where missing. Integer ranks
+    # make every later sort on the column a cheap integer lexsort.
+    import numpy as np
+    import pandas as pd
+    if text and isinstance(values.dtype, pd.CategoricalDtype):
+        # Fold each category once instead of every row
+        category_ranks, _ = pd.factorize(fold_text(values.cat.categories.to_series()), sort=True)
+        return np.append(category_ranks, -1)[values.cat.codes.to_numpy()]
+    ranks, _ = pd.factorize(fold_text(values) if text else values, sort=True)
+    return ranks
+
+
+def sort_permutation(column_ranks, ascending):
+    # Stable multi-key order from rank codes; missing values go last in either direction
+    import numpy as np
+    keys = []
+    for ranks, asc in zip(column_ranks, ascending):
+        top = ranks.max() + 1 if len(ranks) else 0
+        key = ranks if asc else top - 1 - ranks
+        keys.append(np.where(ranks < 0, top, key))
+    return np.lexsort(keys[::-1])
+
+
+def merge_keys(block, by, ascending, text_columns):
+    # Python sort keys matching sort_frame's ordering, one tuple per row
+    parts = []
+    for column, asc in zip(by, ascending):
+        values = key_values(block[column], column in text_columns)
+        missing = values.isna().tolist()
+        values = values.tolist()
+        parts.append([MISSING_KEY if miss else (0, value if asc else Descending(value))
+                      for value, miss in zip(values, missing)])
+    return list(zip(*parts))
+
+
+def iter_source_chunks(path, columns, rows, dtypes=None):
+    # Read a spreadsheet in DataFrames of at most `rows` rows without loading all of it.
+    # dtypes fixes CSV column types that would otherwise be guessed chunk by chunk.
+    import pandas as pd
+    if path.endswith('.csv'):
+        yield from pd.read_csv(path, usecols=columns, chunksize=rows, dtype=dtypes)
+    elif path.endswith('.xls'):
+        data = pd.read_excel(path, usecols=columns)  # Legacy .xls cannot be streamed
+        for start in range(0, len(data), rows):
+            yield data.iloc[start:start + rows]
+    else:
+        from openpyxl import load_workbook
+        workbook = load_workbook(path, read_only=True)
+        try:
+            sheet_rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header = list(next(sheet_rows, ()))
+            columns = list(columns) if columns else header
+            indices = [header.index(column) for column in columns]
+            batch = []
+            for row in sheet_rows:
+                batch.append([row[i] if i < len(row) else None for i in indices])
+                if len(batch) == rows:
+                    yield pd.DataFrame(batch, columns=columns)
+                    batch = []
+            if batch:
+                yield pd.DataFrame(batch, columns=columns)
+        finally:
+            workbook.close()
+
+
+def estimate_row_bytes(path, columns):
+    # Memory used per row when read with default dtypes, from a sample of the file
+    sample = next(iter_source_chunks(path, columns, 1_000), None)
+    if sample is None or not len(sample):
+        return 1
+    return max(1, int(sample.memory_usage(deep=True).sum() / len(sample)))
+
+
+def write_run(path, blocks):
+    with open(path, 'wb') as f:
+        for block in blocks:
+            pickle.dump(block, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def read_run(path, by, ascending, text_columns):
+    # Yield (key, row) pairs from a sorted run, holding one block in memory at a time
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                block = pickle.load(f)
+            except EOFError:
+                return
+            keys = merge_keys(block, by, ascending, text_columns)
+            yield from zip(keys, block.itertuples(index=False, name=None))
+
+
+def merge_runs(runs, by, ascending, text_columns):
+    # k-way merge; ties keep run order, so the sort stays stable
+    sources = [read_run(run, by, ascending, text_columns) for run in runs]
+    for _, row in heapq.merge(*sources, key=lambda item: item[0]):
+        yield row
+
+
+def batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def is_csv_path(path):
+    return path.endswith(('.csv', '.csv.gz', '.csv.zst'))
+
+
+def open_csv_output(path):
+    # Buffered text stream for a CSV save path, compressed according to its extension
+    if path.endswith('.gz'):
+        return gzip.open(path, 'wt', encoding='utf-8', newline='', compresslevel=6)
+    if path.endswith('.zst'):
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError("Saving .zst files needs the zstandard package") from None
+        raw = open(path, 'wb')
+        return io.TextIOWrapper(zstandard.ZstdCompressor().stream_writer(raw), encoding='utf-8', newline='')
+    return open(path, 'w', encoding='utf-8', newline='', buffering=1024 * 1024)
+
+
+def excel_sheet_writer():
+    # Write-only openpyxl workbook: rows are streamed to disk instead of kept as cell objects
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    return workbook, workbook.create_sheet()
+
+
+def export_frame(data, path, progress=None):
+    # Save data in chunks as CSV (optionally .gz/.zst compressed), XLSX or Parquet,
+    # calling progress(rows written, total rows) after every chunk
+    total = len(data)
+    chunks = range(0, total, EXPORT_CHUNK_ROWS)
+    if path.endswith('.parquet'):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.Table.from_pandas(data, preserve_index=False)
+        with pq.ParquetWriter(path, table.schema) as writer:
+            for start in chunks:
+                writer.write_table(table.slice(start, EXPORT_CHUNK_ROWS))
+                if progress:
+                    progress(min(start + EXPORT_CHUNK_ROWS, total), total)
+            if not total:
+                writer.write_table(table)
+    elif is_csv_path(path):
+        with open_csv_output(path) as f:
+            data.iloc[:0].to_csv(f, index=False)
+            for start in chunks:
+                data.iloc[start:start + EXPORT_CHUNK_ROWS].to_csv(f, index=False, header=False)
+                if progress:
+                    progress(min(start + EXPORT_CHUNK_ROWS, total), total)
+    else:
+        if total >= EXCEL_MAX_ROWS:
+            raise ValueError(f"More than {EXCEL_MAX_ROWS - 1:,} rows do not fit in an Excel sheet, save as CSV instead")
+        workbook, sheet = excel_sheet_writer()
+        sheet.append(list(data.columns))
+        for start in chunks:
+            chunk = data.iloc[start:start + EXPORT_CHUNK_ROWS]
+            chunk = chunk.astype(object).where(chunk.notna(), None)  # Missing values become empty cells
+            for row in chunk.itertuples(index=False, name=None):
+                sheet.append(row)
+            if progress:
+                progress(min(start + EXPORT_CHUNK_ROWS, total), total)
+        workbook.save(path)
+
+
+def write_sorted(save_path, columns, rows, block_rows):
+    # Stream merged rows into the CSV or XLSX save path
+    import pandas as pd
+    if is_csv_path(save_path):
+        with open_csv_output(save_path) as f:
+            pd.DataFrame(columns=columns).to_csv(f, index=False)
+            for batch in batched(rows, block_rows):
+                pd.DataFrame(batch, columns=columns).to_csv(f, index=False, header=False)
+        return
+    workbook, sheet = excel_sheet_writer()
+    sheet.append(list(columns))
+    written = 1
+    for row in rows:
+        written += 1
+        if written > EXCEL_MAX_ROWS:
+            raise ValueError(f"More than {EXCEL_MAX_ROWS - 1:,} rows do not fit in an Excel sheet, save as CSV instead")
+        sheet.append([None if value != value else value for value in row])  # NaN becomes an empty cell
+    workbook.save(save_path)
+
+
+def external_sort(path, save_path, by, ascending, text_columns=(), columns=None,
+                  memory_budget_mb=SORT_MEMORY_BUDGET_MB):
+    # Sort a spreadsheet larger than memory: sort fixed-size chunks into runs on disk,
+    # then k-way merge the runs straight into save_path. Memory use stays roughly within
+    # the budget: a chunk, its sorted copy and sort keys while splitting, and one block
+    # per run while merging.
+    import pandas as pd
+    if not (is_csv_path(save_path) or save_path.endswith('.xlsx')):
+        raise ValueError("The on-disk sort saves CSV (.csv, .csv.gz, .csv.zst) or Excel (.xlsx) files")
+    start = time.perf_counter()
+    budget = memory_budget_mb * 1024 * 1024
+    row_bytes = estimate_row_bytes(path, columns)
+    chunk_rows = max(1_000, budget // (row_bytes * 4))
+    block_rows = max(100, chunk_rows // (MERGE_FAN_IN * 4))
+    text_columns = set(text_columns)
+    stats = {'rows': 0, 'runs': 0, 'passes': 1}
+
+    with tempfile.TemporaryDirectory(prefix='external-sort-') as run_dir:
+        runs = []
+        header = columns
+        chunk = None
+        # Text sort keys are read as text in every chunk, even where a chunk only holds numbers
+        key_dtypes = {column: str for column in by if column in text_columns}
+        for chunk in iter_source_chunks(path, columns, chunk_rows, key_dtypes):
+            header = list(chunk.columns)
+            chunk = sort_frame(chunk, by, ascending, text_columns)
+            run = os.path.join(run_dir, f"run{len(runs)}.pickle")
+            write_run(run, (chunk.iloc[i:i + block_rows] for i in range(0, len(chunk), block_rows)))
+            runs.append(run)
+            stats['rows'] += len(chunk)
+        stats['runs'] = len(runs)
+
+        # The whole file fitted in one chunk, so it is already sorted
+        if len(runs) == 1:
+            export_frame(chunk, save_path)
+            stats['seconds'] = time.perf_counter() - start
+            return stats
+
+        # Merge in several passes when there are too many runs to hold one block of each
+        generation = 0
+        while len(runs) > MERGE_FAN_IN:
+            generation += 1
+            merged = []
+            for i in range(0, len(runs), MERGE_FAN_IN):
+                group = runs[i:i + MERGE_FAN_IN]
+                run = os.path.join(run_dir, f"merge{generation}-{len(merged)}.pickle")
+                rows = merge_runs(group, by, ascending, text_columns)
+                write_run(run, (pd.DataFrame(batch, columns=header) for batch in batched(rows, block_rows)))
+                for old in group:
+                    os.remove(old)
+                merged.append(run)
+            runs = merged
+            stats['passes'] += 1
+
+        write_sorted(save_path, header, merge_runs(runs, by, ascending, text_columns), block_rows)
+
+    stats['seconds'] = time.perf_counter() - start
+    return stats
+
+
+def top_categories(values, limit=MAX_CATEGORIES):
+    # Keep the limit - 1 largest entries in their original order and sum the rest into "Other"
+    import pandas as pd
+    if len(values) <= limit:
+        return values
+    keep = values.index.isin(values.abs().nlargest(limit - 1).index)
+    other = pd.Series([values[~keep].sum()], index=["Other"])
+    return pd.concat([values[keep], other])
+
+
+def top_frame(frame, limit=MAX_CATEGORIES):
+    # top_categories for grouped data: too many rows or group columns are merged into "Other"
+    import pandas as pd
+    if len(frame) > limit:
+        keep = frame.index.isin(frame.abs().sum(axis=1).nlargest(limit - 1).index)
+        other = frame[~keep].sum().to_frame("Other").T
+        frame = pd.concat([frame[keep], other])
+    if len(frame.columns) > limit:
+        keep = frame.columns.isin(frame.abs().sum().nlargest(limit - 1).index)
+        frame = frame.loc[:, keep].assign(Other=frame.loc[:, ~keep].sum(axis=1))
+    return frame
+
+
+def scaled_formatter(scale_factor):
+    # Show axis values divided by scale_factor without dividing the plotted data
+    from matplotlib.ticker import FuncFormatter
+    return FuncFormatter(lambda value, _: f"{value / scale_factor:g}")
+
+
+def plot_positions(values):
+    # Numeric X positions for a line chart, plus tick labels when the values are not numbers
+    import numpy as np
+    from pandas.api.types import is_bool_dtype, is_datetime64_any_dtype, is_numeric_dtype
+    import matplotlib.dates as mdates
+    if is_datetime64_any_dtype(values):
+        return mdates.date2num(values.to_numpy()), None
+    if is_numeric_dtype(values) and not is_bool_dtype(values):
+        return values.to_numpy(dtype=float, na_value=np.nan), None
+    return np.arange(len(values), dtype=float), np.asarray(values, dtype=object)
+
+
+def minmax_decimate(y, buckets):
+    # Indices of the minimum and maximum of each bucket, in order; the drawn line keeps
+    # every spike while plotting at most two points per pixel column
+    import numpy as np
+    n = len(y)
+    if n <= 2 * buckets:
+        return np.arange(n)
+    size = -(-n // buckets)
+    count = -(-n // size)
+    values = np.asarray(y, dtype=float)
+    low = np.full(count * size, np.inf)
+    high = np.full(count * size, -np.inf)
+    low[:n] = np.where(np.isnan(values), np.inf, values)
+    high[:n] = np.where(np.isnan(values), -np.inf, values)
+    starts = np.arange(count) * size
+    indices = np.concatenate([starts + low.reshape(count, size).argmin(axis=1),
+                              starts + high.reshape(count, size).argmax(axis=1), [0, n - 1]])
+    indices = np.unique(indices)
+    return indices[indices < n]
+
+
+class DecimatedLines:
+    # Line chart that only hands matplotlib the points it can show: min/max per pixel
+    # column of the visible X range. Zooming or panning recomputes the points from the
+    # full data, so detail appears as the user zooms in.
+    def __init__(self, ax, x, series):
+        import numpy as np
+        from pandas.api.types import is_datetime64_any_dtype
+        from matplotlib.ticker import FuncFormatter, MaxNLocator
+        self.ax = ax
+        self.x, self.labels = plot_positions(x)
+        self.sorted_x = bool(np.all(self.x[1:] >= self.x[:-1]))
+        self.series = [(label, np.asarray(y, dtype=float)) for label, y in series]
+        self.lines = [ax.plot([], [], label=str(label))[0] for label, _ in self.series]
+        if is_datetime64_any_dtype(x):
+            ax.xaxis_date()
+        elif self.labels is not None:
+            ax.xaxis.set_major_locator(MaxNLocator(integer=True))
+            ax.xaxis.set_major_formatter(FuncFormatter(self.tick_label))
+        self.refresh(None)
+        ax.relim()
+        ax.autoscale_view()
+        ax.callbacks.connect('xlim_changed', self.on_xlim_changed)
+
+    def tick_label(self, position, _):
+        index = int(round(position))
+        return str(self.labels[index]) if 0 <= index < len(self.labels) else ""
+
+    def visible(self, limits):
+        import numpy as np
+        if limits is None:
+            return np.arange(len(self.x))
+        low, high = limits
+        if self.sorted_x:
+            # One point beyond each edge so the line runs to the border
+            start = max(np.searchsorted(self.x, low, side='left') - 1, 0)
+            stop = min(np.searchsorted(self.x, high, side='right') + 1, len(self.x))
+            return np.arange(start, stop)
+        return np.flatnonzero((self.x >= low) & (self.x <= high))
+
+    def refresh(self, limits):
+        visible = self.visible(limits)
+        buckets = max(100, int(self.ax.bbox.width))
+        for line, (_, y) in zip(self.lines, self.series):
+            keep = visible[minmax_decimate(y[visible], buckets)]
+            line.set_data(self.x[keep], y[keep])
+
+    def on_xlim_changed(self, ax):
+        self.refresh(ax.get_xlim())
+        ax.figure.canvas.draw_idle()
+
+
+def sort_frame_by_ranks(data, by, ascending):
+    # Same ordering as the sort window: case-folded text, missing values last
+    ranks = [rank_codes(data[column], is_text(data[column])) for column in by]
+    return data.take(sort_permutation(ranks, ascending))
+
+
+def aggregate_frame(data, by, y_axis, unstack=False, sort=True):
+    # Sum of y_axis per group, unstacked into one column per group for stacked charts
+    totals = data.groupby(by if len(by) > 1 else by[0], sort=sort, observed=True)[y_axis].sum()
+    return totals.unstack() if unstack else totals
+
+
+def draw_chart(ax, graph_type, data, x_axis, y_axis, group_column, aggregate=None):
+    # Draw one chart on ax. Returns the DecimatedLines of a line chart, which must stay
+    # referenced for zooming to refine it.
+    if aggregate is None:
+        aggregate = functools.partial(aggregate_frame, data)
+    lines = None
+
+    if graph_type == 'bar':
+        # Check if values are too large and scale the tick labels down; the data itself is left untouched
+        max_value = data[y_axis].max()
+        scale_factor = 1
+        if max_value > 1_000_000:
+            scale_factor = 1_000_000
+            y_label = f"{y_axis} (in millions)"
+        elif max_value > 1_000:
+            scale_factor = 1_000
+            y_label = f"{y_axis} (in thousands)"
+        else:
+            y_label = y_axis
+
+        # Plot the bar graph with grouping, merging bars beyond MAX_CATEGORIES into "Other"
+        if group_column != "None":
+            # Group data by X-axis and Grouping column
+            grouped_data = aggregate([x_axis, group_column], y_axis, unstack=True)
+            top_frame(grouped_data).plot(kind='bar', ax=ax, stacked=True)
+        elif len(data) > MAX_CATEGORIES:
+            totals = aggregate([x_axis], y_axis, sort=False)
+            top_categories(totals).plot(kind='bar', ax=ax, legend=False)
+        else:
+            data.plot(kind='bar', x=x_axis, y=y_axis, ax=ax, legend=False)
+
+        ax.set_xlabel(x_axis)  # Label X-axis
+        ax.set_ylabel(y_label)  # Label Y-axis with scaling information
+        if scale_factor != 1:
+            ax.yaxis.set_major_formatter(scaled_formatter(scale_factor))
+        for label in ax.get_xticklabels():  # Rotate x-axis labels for better readability
+            label.set_rotation(45)
+            label.set_horizontalalignment('right')
+        ax.grid(True)  # Add gridlines for better readability
+        if group_column != "None":
+            ax.legend(title=group_column)  # Add legend if grouping is applied
+
+    elif graph_type == 'line':
+        # Plot the line graph with grouping, decimated to the pixels on screen
+        if group_column != "None":
+            grouped_data = aggregate([x_axis, group_column], y_axis, unstack=True)
+            series = [(column, grouped_data[column]) for column in grouped_data.columns]
+            lines = DecimatedLines(ax, grouped_data.index.to_series(), series)
+        else:
+            lines = DecimatedLines(ax, data[x_axis], [(y_axis, data[y_axis])])
+            ax.legend()
+
+        ax.set_xlabel(x_axis)  # Label X-axis
+        ax.set_ylabel(y_axis)  # Label Y-axis
+        ax.grid(True)  # Add gridlines for better readability
+        if group_column != "None":
+            ax.legend(title=group_column)  # Add legend if grouping is applied
+
+    elif graph_type == 'pie':
+        # Plot the pie chart
+        if group_column != "None":
+            grouped_data = top_categories(aggregate([group_column], y_axis))
+            grouped_data.plot(kind='pie', ax=ax, legend=False, labels=grouped_data.index, autopct='%1.1f%%')
+        elif len(data) > MAX_CATEGORIES:
+            totals = top_categories(aggregate([x_axis], y_axis, sort=False))
+            totals.plot(kind='pie', ax=ax, legend=False, labels=totals.index, autopct='%1.1f%%')
+        else:
+            data.plot(kind='pie', y=y_axis, labels=data[x_axis], ax=ax, legend=False, autopct='%1.1f%%')
+
+        ax.set_ylabel("")  # Remove Y-axis label for pie chart
+
+    return lines
+
+
 class DataAnalysisApp:
     def __init__(self):
         self.root = tkdnd.TkinterDnD.Tk()  # Use tkinterdnd2's Tk class for drag-and-drop support
         self.root.title("Data Analysis Tool")
         self.file_path = None
         self.data = None
+        self.load_stats = None
+        self.cache = SidecarCache()
+        self.order = None  # Current row order, as positions in the loaded file
+        self.rank_cache = {}  # Column -> rank codes in loaded order
+        self.sort_index_cache = {}  # (columns, directions) -> row order, least recently used first
+        self.data_version = 0  # Bumped whenever the rows of self.data change
+        self.aggregate_cache = {}  # (group keys, y, unstack, sort, data version) -> aggregated values
+        self.figure = None
+        self.canvas = None
+        self.lines = None
+        self.background_jobs = []  # (thread, report) of saves and sorts still to be reported
         self.setup_ui()
 
         # Ensure the program exits when the window is closed
@@ -39,10 +798,56 @@ class DataAnalysisApp:
 
     def process_file(self):
         try:
-            if self.file_path.endswith('.csv'):
-                self.data = pd.read_csv(self.file_path)  # Read CSV file
-            else:
-                self.data = pd.read_excel(self.file_path)  # Read Excel file
+            columns = read_header(self.file_path)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to read the file: {e}")
+            return
+
+        # Large files only load the columns the user actually needs, or are sorted on disk
+        # without being loaded at all
+        if os.path.getsize(self.file_path) > LARGE_FILE_BYTES:
+            self.show_column_picker(columns)
+        else:
+            self.load_data()
+
+    def show_column_picker(self, columns):
+        self.column_window = tk.Toplevel()  # Create a new window for column selection
+        self.column_window.title("Choose Columns to Load")
+
+        tk.Label(self.column_window, text="This file is large. Select the columns to load, or sort it on disk without loading it:").grid(row=0, column=0, columnspan=len(columns), padx=5, pady=5)
+        column_vars = {}
+        for idx, column in enumerate(columns):
+            column_vars[column] = tk.BooleanVar(value=True)
+            tk.Checkbutton(self.column_window, text=column, variable=column_vars[column]).grid(row=1, column=idx, padx=5, pady=5, sticky='w')
+
+        def confirm():
+            chosen = [column for column in columns if column_vars[column].get()]
+            if not chosen:
+                messagebox.showerror("Error", "Select at least one column to load.")
+                return
+            self.column_window.destroy()
+            self.load_data(chosen)
+
+        def sort_without_loading():
+            chosen = [column for column in columns if column_vars[column].get()]
+            if not chosen:
+                messagebox.showerror("Error", "Select at least one column to sort.")
+                return
+            self.show_disk_sort_options(chosen)
+
+        button_frame = tk.Frame(self.column_window)
+        button_frame.grid(row=2, column=0, columnspan=len(columns), pady=10)
+        tk.Button(button_frame, text="Load", command=confirm).pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Sort on Disk Without Loading...", command=sort_without_loading).pack(side=tk.LEFT, padx=5)
+
+    def load_data(self, columns=None):
+        import numpy as np
+        try:
+            self.data, self.load_stats = load_spreadsheet(self.file_path, columns, self.cache)
+            self.order = np.arange(len(self.data))
+            self.bump_data_version()
+            self.rank_cache.clear()
+            self.sort_index_cache.clear()
             self.root.withdraw()  # Hide the upload window instead of closing it
             self.show_sort_options()
         except Exception as e:
@@ -51,62 +856,264 @@ class DataAnalysisApp:
     def show_sort_options(self):
         self.sort_window = tk.Toplevel()  # Create a new window for sorting options
         self.sort_window.title("Sort Data")
-        
-        self.sort_var = tk.StringVar(value="None")
-        self.order_var = tk.StringVar(value="Ascending")
 
-        # Place column selection radio buttons horizontally
-        for idx, column in enumerate(self.data.columns):
-            rb = tk.Radiobutton(self.sort_window, text=column, variable=self.sort_var, value=column)
-            rb.grid(row=0, column=idx, padx=5, pady=5, sticky='w')  # Place in row 0, column idx
+        # One row per sort key, each with its own direction
+        self.sort_columns = list(self.data.columns)
+        self.sort_levels = []
+        self.levels_frame = tk.Frame(self.sort_window)
+        self.levels_frame.grid(row=0, column=0, columnspan=len(self.data.columns), pady=5)
+        self.add_sort_level()
+        self.sort_var = self.sort_levels[0][0]  # The first key is also the default X-axis
 
-        # Create a frame for ascending/descending radio buttons
-        order_frame = tk.Frame(self.sort_window)
-        order_frame.grid(row=1, column=0, columnspan=len(self.data.columns), pady=10)
+        tk.Button(self.sort_window, text="Add Sort Level", command=self.add_sort_level).grid(row=1, column=0, columnspan=len(self.data.columns), pady=5)
 
-        # Place ascending/descending radio buttons in the frame
-        tk.Radiobutton(order_frame, text="Ascending", variable=self.order_var, value="Ascending").pack(side=tk.LEFT, padx=5)
-        tk.Radiobutton(order_frame, text="Descending", variable=self.order_var, value="Descending").pack(side=tk.LEFT, padx=5)
+        # Apply sorts in place to try orderings, Confirm continues to saving and graphing
+        button_frame = tk.Frame(self.sort_window)
+        button_frame.grid(row=3, column=0, columnspan=len(self.data.columns), pady=10)
+        tk.Button(button_frame, text="Apply", command=self.apply_sort_choice).pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Confirm", command=self.sort_data).pack(side=tk.LEFT, padx=5)
 
-        # Add a confirm button
-        confirm_button = tk.Button(self.sort_window, text="Confirm", command=self.sort_data)
-        confirm_button.grid(row=2, column=0, columnspan=len(self.data.columns), pady=10)
+        self.sort_status = tk.Label(self.sort_window, text="")
+        self.sort_status.grid(row=4, column=0, columnspan=len(self.data.columns), pady=5)
 
-    def sort_data(self):
-        if self.sort_var.get() != "None":
-            ascending = self.order_var.get() == "Ascending"
-            sort_column = self.sort_var.get()
+        # Report how long the file took to load and how much memory it uses
+        if self.load_stats:
+            tk.Label(self.sort_window, text=describe_load(self.load_stats)).grid(row=5, column=0, columnspan=len(self.data.columns), pady=5)
 
-            # Handle string-based columns (case-insensitive sorting)
-            if self.data[sort_column].dtype == object:  # Check if the column contains strings
-                self.data = self.data.sort_values(by=sort_column, ascending=ascending, key=lambda col: col.str.lower())
-            else:
-                self.data = self.data.sort_values(by=sort_column, ascending=ascending)
+    def show_disk_sort_options(self, columns):
+        # Sort the file on disk straight into a new file, reading only its header and a sample
+        # first, so files larger than memory never have to be loaded
+        self.disk_sort_window = tk.Toplevel()
+        self.disk_sort_window.title("Sort on Disk")
+
+        self.sort_columns = columns
+        self.sort_levels = []
+        self.levels_frame = tk.Frame(self.disk_sort_window)
+        self.levels_frame.grid(row=0, column=0, pady=5)
+        self.add_sort_level()
+        tk.Button(self.disk_sort_window, text="Add Sort Level", command=self.add_sort_level).grid(row=1, column=0, pady=5)
+
+        budget_frame = tk.Frame(self.disk_sort_window)
+        budget_frame.grid(row=2, column=0, pady=5)
+        tk.Label(budget_frame, text="Memory budget (MB):").pack(side=tk.LEFT, padx=5)
+        self.memory_budget_var = tk.StringVar(value=str(SORT_MEMORY_BUDGET_MB))
+        tk.Entry(budget_frame, textvariable=self.memory_budget_var, width=8).pack(side=tk.LEFT, padx=5)
+
+        self.disk_sort_button = tk.Button(self.disk_sort_window, text="Sort and Save...", command=lambda: self.sort_on_disk(columns))
+        self.disk_sort_button.grid(row=3, column=0, pady=10)
+
+    def add_sort_level(self):
+        level = len(self.sort_levels)
+        if level >= len(self.sort_columns):
+            return
+        column_var = tk.StringVar(value="None")
+        order_var = tk.StringVar(value="Ascending")
+        tk.Label(self.levels_frame, text="Sort by" if level == 0 else "Then by").grid(row=level, column=0, padx=5, pady=5, sticky='w')
+        tk.OptionMenu(self.levels_frame, column_var, "None", *self.sort_columns).grid(row=level, column=1, padx=5, pady=5, sticky='w')
+        tk.Radiobutton(self.levels_frame, text="Ascending", variable=order_var, value="Ascending").grid(row=level, column=2, padx=5)
+        tk.Radiobutton(self.levels_frame, text="Descending", variable=order_var, value="Descending").grid(row=level, column=3, padx=5)
+        self.sort_levels.append((column_var, order_var))
+
+    def selected_sort_keys(self):
+        by, ascending = [], []
+        for column_var, order_var in self.sort_levels:
+            column = column_var.get()
+            if column != "None" and column not in by:
+                by.append(column)
+                ascending.append(order_var.get() == "Ascending")
+        return by, ascending
+
+    def column_ranks(self, column):
+        # Rank codes are computed once per column and kept in loaded order
+        import numpy as np
+        if column not in self.rank_cache:
+            values = self.data[column]
+            ranks = rank_codes(values, is_text(values))
+            loaded_order = np.empty_like(ranks)
+            loaded_order[self.order] = ranks
+            self.rank_cache[column] = loaded_order
+        return self.rank_cache[column]
+
+    def sort_index(self, by, ascending):
+        # Row order for the given keys, from the cache when this sort was done before
+        key = (tuple(by), tuple(ascending))
+        order = self.sort_index_cache.pop(key, None)
+        reused = order is not None
+        if not reused:
+            order = sort_permutation([self.column_ranks(column) for column in by], ascending)
+        self.sort_index_cache[key] = order
+        while len(self.sort_index_cache) > SORT_INDEX_CACHE_SIZE:
+            del self.sort_index_cache[next(iter(self.sort_index_cache))]
+        return order, reused
+
+    def apply_sort(self, by, ascending):
+        import numpy as np
+        start = time.perf_counter()
+        order, reused = self.sort_index(by, ascending)
+        # Rearrange the current frame into the new order without going back to the loaded one
+        position = np.empty_like(self.order)
+        position[self.order] = np.arange(len(self.order))
+        self.data = self.data.take(position[order])
+        self.order = order
+        self.bump_data_version()
+        how = "Reused the cached order of" if reused else "Sorted"
+        return f"{how} {len(order):,} rows in {time.perf_counter() - start:.2f} s"
+
+    def bump_data_version(self):
+        # Aggregates of the previous data can never be used again
+        self.data_version += 1
+        self.aggregate_cache.clear()
+
+    def aggregate(self, by, y_axis, unstack=False, sort=True):
+        # Sum of y_axis per group, shared by every chart type drawn on the same selection
+        key = (tuple(by), y_axis, unstack, sort, self.data_version)
+        if key not in self.aggregate_cache:
+            self.aggregate_cache[key] = aggregate_frame(self.data, by, y_axis, unstack, sort)
+        return self.aggregate_cache[key]
+
+    def apply_sort_choice(self):
+        by, ascending = self.selected_sort_keys()
+        if by:
+            self.sort_status.config(text=self.apply_sort(by, ascending))
+
+    def sort_data(self):
+        by, ascending = self.selected_sort_keys()
+        if by:
+            self.apply_sort(by, ascending)
 
             # Prompt the user if they want to save the sorted spreadsheet
             save_response = messagebox.askyesno("Save Spreadsheet", "Would you like to save the sorted spreadsheet?")
             if save_response:
-                save_path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel files", "*.xlsx"), ("CSV files", "*.csv")])
+                save_path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=EXPORT_FILETYPES)
                 if save_path:
-                    if save_path.endswith('.csv'):
-                        self.data.to_csv(save_path, index=False)
-                    else:
-                        self.data.to_excel(save_path, index=False)
-                    messagebox.showinfo("Success", "Sorted spreadsheet saved successfully!")
+                    self.start_export(self.data, save_path)
 
             self.sort_window.destroy()  # Close the sorting window
             self.ask_graph()
 
+    def start_export(self, data, save_path):
+        # Save in a background thread so the window stays responsive; the sorted frame is
+        # never modified in place, so the thread can read it while the user goes on graphing
+        progress_window = tk.Toplevel()
+        progress_window.title("Saving")
+        label = tk.Label(progress_window, text=f"Saving {os.path.basename(save_path)}...")
+        label.pack(padx=10, pady=5)
+        progress_bar = ttk.Progressbar(progress_window, length=300, maximum=max(len(data), 1))
+        progress_bar.pack(padx=10, pady=10)
+
+        updates = queue.Queue()
+
+        def export():
+            start = time.perf_counter()
+            try:
+                export_frame(data, save_path, progress=lambda done, total: updates.put(('progress', done)))
+                updates.put(('done', time.perf_counter() - start))
+            except Exception as e:
+                updates.put(('error', e))
+
+        def report():
+            # Show queued progress, and the result once the export has finished
+            try:
+                while True:
+                    kind, value = updates.get_nowait()
+                    if kind == 'progress':
+                        progress_bar['value'] = value
+                        label.config(text=f"Saving {os.path.basename(save_path)}: {value:,} of {len(data):,} rows")
+                    elif kind == 'done':
+                        progress_window.destroy()
+                        messagebox.showinfo("Success", f"Sorted spreadsheet saved successfully in {value:.1f} s!")
+                        return True
+                    else:
+                        progress_window.destroy()
+                        messagebox.showerror("Error", f"Failed to save the spreadsheet: {value}")
+                        return True
+            except queue.Empty:
+                return False
+
+        def poll():
+            if not report():
+                self.root.after(100, poll)
+
+        # Not a daemon thread, so closing the app still lets the file finish writing
+        thread = threading.Thread(target=export, name="export")
+        thread.start()
+        self.background_jobs.append((thread, report))
+        self.root.after(100, poll)
+
+    def sort_on_disk(self, columns):
+        by, ascending = self.selected_sort_keys()
+        if not by:
+            messagebox.showerror("Error", "Choose at least one column to sort by.")
+            return
+        try:
+            memory_budget = int(self.memory_budget_var.get())
+            if memory_budget < 16:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("Error", "Memory budget must be a whole number of at least 16 MB.")
+            return
+
+        save_path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=EXPORT_FILETYPES[1:4] + EXPORT_FILETYPES[:1])
+        if not save_path:
+            return
+        try:
+            text_columns = sample_text_columns(self.file_path, by)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to read the file: {e}")
+            return
+
+        # Sort in a background thread, reporting back through a queue like start_export
+        window = self.disk_sort_window
+        self.disk_sort_button.config(state=tk.DISABLED)
+        label = tk.Label(window, text=f"Sorting {os.path.basename(self.file_path)}...")
+        label.grid(row=4, column=0, padx=10, pady=5)
+        progress_bar = ttk.Progressbar(window, length=300, mode='indeterminate')
+        progress_bar.grid(row=5, column=0, padx=10, pady=10)
+        progress_bar.start()
+
+        updates = queue.Queue()
+
+        def sort():
+            try:
+                updates.put(('done', external_sort(self.file_path, save_path, by, ascending, text_columns, columns, memory_budget)))
+            except Exception as e:
+                updates.put(('error', e))
+
+        def report():
+            # Show the result once the sort has finished
+            try:
+                kind, value = updates.get_nowait()
+            except queue.Empty:
+                return False
+            window.destroy()
+            if kind == 'done':
+                messagebox.showinfo("Success", f"Sorted {value['rows']:,} rows in {value['seconds']:.1f} s "
+                                               f"({value['runs']} runs, {value['passes']} merge passes) and saved them successfully!")
+            else:
+                messagebox.showerror("Error", f"Failed to sort the file: {value}")
+            return True
+
+        def poll():
+            if not report():
+                self.root.after(100, poll)
+
+        # Not a daemon thread, so closing the app still lets the sorted file finish writing
+        thread = threading.Thread(target=sort, name="external-sort")
+        thread.start()
+        self.background_jobs.append((thread, report))
+        self.root.after(100, poll)
+
     def ask_graph(self):
         response = messagebox.askyesno("Graph", "Would you like to create a graph?")
         if response:
             self.show_graph_options()
         else:
-            self.root.quit()
+            self.quit()
 
     def show_graph_options(self):
         self.graph_window = tk.Toplevel()  # Create a new window for graph options
         self.graph_window.title("Choose Graph Type")
+        self.canvas = None  # The chart view is created in this window on the first draw
         
         # Place chart type buttons horizontally
         button_frame = tk.Frame(self.graph_window)
@@ -117,12 +1124,6 @@ class DataAnalysisApp:
         tk.Button(button_frame, text="Pie", command=lambda: self.create_graph('pie')).pack(side=tk.LEFT, padx=5)
 
     def create_graph(self, graph_type):
-        # Clear previous chart if it exists
-        if hasattr(self, 'canvas'):
-            self.canvas.get_tk_widget().destroy()
-            if hasattr(self, 'toolbar'):
-                self.toolbar.destroy()
-
         # Create a new window for axis selection
         self.axis_window = tk.Toplevel()
         self.axis_window.title("Select Axes and Grouping")
@@ -136,7 +1137,7 @@ class DataAnalysisApp:
 
         # Add Y-axis selection
         tk.Label(self.axis_window, text="Select Y-axis:").grid(row=2, column=0, padx=5, pady=5)
-        self.y_axis_var = tk.StringVar(value=self.data.columns[1])  # Default to second column
+        self.y_axis_var = tk.StringVar(value=self.data.columns[min(1, len(self.data.columns) - 1)])  # Default to second column
         for idx, column in enumerate(self.data.columns):
             rb = tk.Radiobutton(self.axis_window, text=column, variable=self.y_axis_var, value=column)
             rb.grid(row=3, column=idx, padx=5, pady=5, sticky='w')
@@ -153,78 +1154,40 @@ class DataAnalysisApp:
         confirm_button.grid(row=6, column=0, columnspan=len(self.data.columns), pady=10)
 
     def draw_graph(self, graph_type):
+        from pandas.api.types import is_numeric_dtype
         # Get selected axes and grouping column
         x_axis = self.x_axis_var.get()
         y_axis = self.y_axis_var.get()
         group_column = self.group_var.get()
 
         # Check if Y-axis is numeric
-        if self.data[y_axis].dtype == object:  # Check if the column contains strings
+        if not is_numeric_dtype(self.data[y_axis]):  # Check if the column contains strings
             messagebox.showerror("Error", "Y-axis must be a numeric column. Please select a different column.")
             return
 
-        # Create a new figure
-        fig, ax = plt.subplots(figsize=(12, 8))  # Increase figure size for better readability
-
-        if graph_type == 'bar':
-            # Check if values are too large and scale them down
-            max_value = self.data[y_axis].max()
-            scale_factor = 1
-            if max_value > 1_000_000:
-                scale_factor = 1_000_000
-                self.data[y_axis] = self.data[y_axis] / scale_factor
-                y_label = f"{y_axis} (in millions)"
-            elif max_value > 1_000:
-                scale_factor = 1_000
-                self.data[y_axis] = self.data[y_axis] / scale_factor
-                y_label = f"{y_axis} (in thousands)"
-            else:
-                y_label = y_axis
+        # Clear the persistent chart and draw on a fresh set of axes
+        self.show_chart_view()
+        self.figure.clear()
+        ax = self.figure.add_subplot()
+        self.lines = draw_chart(ax, graph_type, self.data, x_axis, y_axis, group_column, self.aggregate)
 
-            # Plot the bar graph with grouping
-            if group_column != "None":
-                # Group data by X-axis and Grouping column
-                grouped_data = self.data.groupby([x_axis, group_column])[y_axis].sum().unstack()
-                grouped_data.plot(kind='bar', ax=ax, stacked=True)
-            else:
-                self.data.plot(kind='bar', x=x_axis, y=y_axis, ax=ax, legend=False)
-
-            ax.set_xlabel(x_axis)  # Label X-axis
-            ax.set_ylabel(y_label)  # Label Y-axis with scaling information
-            plt.xticks(rotation=45, ha='right')  # Rotate x-axis labels for better readability
-            ax.grid(True)  # Add gridlines for better readability
-            if group_column != "None":
-                ax.legend(title=group_column)  # Add legend if grouping is applied
-
-        elif graph_type == 'line':
-            # Plot the line graph with grouping
-            if group_column != "None":
-                grouped_data = self.data.groupby([x_axis, group_column])[y_axis].sum().unstack()
-                grouped_data.plot(kind='line', ax=ax)
-            else:
-                self.data.plot(kind='line', x=x_axis, y=y_axis, ax=ax)
-
-            ax.set_xlabel(x_axis)  # Label X-axis
-            ax.set_ylabel(y_axis)  # Label Y-axis
-            ax.grid(True)  # Add gridlines for better readability
-            if group_column != "None":
-                ax.legend(title=group_column)  # Add legend if grouping is applied
-
-        elif graph_type == 'pie':
-            # Plot the pie chart
-            if group_column != "None":
-                grouped_data = self.data.groupby(group_column)[y_axis].sum()
-                grouped_data.plot(kind='pie', ax=ax, legend=False, labels=grouped_data.index, autopct='%1.1f%%')
-            else:
-                self.data.plot(kind='pie', y=y_axis, labels=self.data[x_axis], ax=ax, legend=False, autopct='%1.1f%%')
+        self.figure.tight_layout()  # Adjust layout to prevent overlapping
+        self.canvas.draw_idle()
+        self.toolbar.update()  # Forget the zoom history of the previous chart
 
-            ax.set_ylabel("")  # Remove Y-axis label for pie chart
+        # Close the axis selection window
+        self.axis_window.destroy()
 
-        plt.tight_layout()  # Adjust layout to prevent overlapping
+    def show_chart_view(self):
+        # One Figure, canvas and toolbar per graph window, reused by every redraw
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+        if self.canvas is not None and self.canvas.get_tk_widget().winfo_exists():
+            return
+        self.figure = Figure(figsize=(12, 8))  # Increase figure size for better readability
 
         # Embed the chart in the Tkinter window
-        self.canvas = FigureCanvasTkAgg(fig, master=self.graph_window)
-        self.canvas.draw()
+        self.canvas = FigureCanvasTkAgg(self.figure, master=self.graph_window)
         self.canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
 
         # Add a toolbar for zooming and panning
@@ -233,12 +1196,9 @@ class DataAnalysisApp:
         self.canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
 
         # Add a save button for the graph
-        save_button = tk.Button(self.graph_window, text="Save Graph", command=lambda: self.save_graph(fig))
+        save_button = tk.Button(self.graph_window, text="Save Graph", command=lambda: self.save_graph(self.figure))
         save_button.pack(side=tk.BOTTOM, pady=10)
 
-        # Close the axis selection window
-        self.axis_window.destroy()
-
     def save_graph(self, fig):
         # Prompt the user to save the graph
         save_path = filedialog.asksaveasfilename(defaultextension=".png", filetypes=[("PNG files", "*.png"), ("JPEG files", "*.jpg"), ("PDF files", "*.pdf")])
@@ -248,8 +1208,184 @@ class DataAnalysisApp:
 
     def on_close(self):
         """Handle window close event."""
+        self.quit()
+
+    def quit(self):
+        # Stopping the main loop also stops the polls, so wait for saves and sorts still
+        # running and report how they ended before leaving
+        self.root.config(cursor='watch')
+        self.root.update_idletasks()
+        for thread, report in self.background_jobs:
+            thread.join()
+            report()
+        self.background_jobs = []
         self.root.quit()
 
-if __name__ == "__main__":
+def parse_sort_key(text):
+    # "column" or "column:desc" -> (column, ascending)
+    column, _, direction = text.rpartition(':')
+    if column and direction.lower() in ('asc', 'desc'):
+        return column, direction.lower() == 'asc'
+    return text, True
+
+
+def report_file(path, job, output_name):
+    # Sort one spreadsheet and draw its chart without any window; runs in a worker process
+    from pandas.api.types import is_numeric_dtype
+    import matplotlib
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    matplotlib.use('Agg')
+    record = {'path': path, 'outputs': []}
+    start = time.perf_counter()
+    try:
+        cache = None if job['no_cache'] else SidecarCache()
+        data, stats = load_spreadsheet(path, job['columns'], cache)
+        record['rows'] = stats['rows']
+
+        if job['sort']:
+            by, ascending = zip(*job['sort'])
+            data = sort_frame_by_ranks(data, list(by), list(ascending))
+            sorted_path = os.path.join(job['output_dir'], f"{output_name}.sorted.{job['format'] or ('csv' if path.endswith('.csv') else 'xlsx')}")
+            export_frame(data, sorted_path)
+            record['outputs'].append(sorted_path)
+
+        if job['chart']:
+            if not is_numeric_dtype(data[job['y']]):
+                raise ValueError(f"Y-axis column {job['y']!r} is not numeric")
+            figure = Figure(figsize=(12, 8))
+            FigureCanvasAgg(figure)
+            draw_chart(figure.add_subplot(), job['chart'], data, job['x'], job['y'], job['group'] or "None")
+            figure.tight_layout()
+            for chart_format in job['chart_format']:
+                chart_path = os.path.join(job['output_dir'], f"{output_name}.{job['chart']}.{chart_format}")
+                figure.savefig(chart_path)
+                record['outputs'].append(chart_path)
+        record['ok'] = True
+    except Exception as e:
+        record['ok'] = False
+        record['error'] = str(e)
+    record['seconds'] = round(time.perf_counter() - start, 3)
+    return record
+
+
+def output_names(paths):
+    # File stems, numbered when two inputs in different folders share a name
+    names, seen = [], {}
+    for path in paths:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        seen[stem] = seen.get(stem, 0) + 1
+        names.append(stem if seen[stem] == 1 else f"{stem}-{seen[stem]}")
+    return names
+
+
+def run_batch(args):
+    # Process every file matching the job's input glob in parallel and write the reports
+    paths = sorted(path for pattern in args.input for path in glob.glob(pattern, recursive=True)
+                   if path.lower().endswith(('.csv', '.xlsx', '.xls')))
+    if not paths:
+        print("No spreadsheets match the input pattern", file=sys.stderr)
+        return 2
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    job = {
+        'columns': args.columns,
+        'sort': [parse_sort_key(key) for key in args.sort],
+        'format': args.format,
+        'chart': args.chart,
+        'x': args.x,
+        'y': args.y,
+        'group': args.group,
+        'chart_format': args.chart_format,
+        'output_dir': args.output_dir,
+        'no_cache': args.no_cache,
+    }
+
+    records = []
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=args.processes) as executor:
+            futures = [executor.submit(report_file, path, job, name) for path, name in zip(paths, output_names(paths))]
+            for future in as_completed(futures):
+                records.append(future.result())
+    except KeyboardInterrupt:
+        print("Interrupted", file=sys.stderr)
+        return 130
+
+    failed = [record for record in records if not record['ok']]
+    for record in sorted(records, key=lambda r: r['path']):
+        status = "ok" if record['ok'] else "FAIL"
+        detail = f"  ({record['error']})" if not record['ok'] else f"  {record['rows']:,} rows -> {', '.join(record['outputs'])}"
+        print(f"{status:5} {record['seconds']:8.2f}s  {record['path']}{detail}", file=sys.stderr)
+    print(f"{len(records)} files: {len(records) - len(failed)} ok, {len(failed)} failed in {time.perf_counter() - start:.2f}s",
+          file=sys.stderr)
+    return 1 if failed else 0
+
+
+JOB_SPEC_KEYS = ('input', 'columns', 'sort', 'format', 'chart', 'x', 'y', 'group', 'chart_format',
+                 'output_dir', 'processes', 'no_cache')
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description="Sort spreadsheets and draw their charts without the GUI.",
+        epilog="Run without arguments to open the Data Analysis Tool window. Options given on the "
+               "command line override the job spec.",
+    )
+    parser.add_argument('--job', help=f"JSON job spec with any of the keys: {', '.join(JOB_SPEC_KEYS)}")
+    parser.add_argument('--input', action='append', help="glob of spreadsheets to process, may be repeated")
+    parser.add_argument('--columns', nargs='+', help="only load these columns")
+    parser.add_argument('--sort', action='append', default=None, help="sort key as COLUMN or COLUMN:desc, may be repeated")
+    parser.add_argument('--format', choices=["csv", "csv.gz", "csv.zst", "xlsx", "parquet"],
+                        help="format of the sorted files (default: same as the input)")
+    parser.add_argument('--chart', choices=["bar", "line", "pie"], help="chart to draw for each file")
+    parser.add_argument('--x', help="X-axis column of the chart")
+    parser.add_argument('--y', help="Y-axis column of the chart")
+    parser.add_argument('--group', help="grouping column of the chart")
+    parser.add_argument('--chart-format', nargs='+', choices=["png", "pdf"], help="chart file formats (default: png)")
+    parser.add_argument('--output-dir', help="folder for the sorted files and charts (default: reports)")
+    parser.add_argument('--processes', type=int, help="files processed at the same time (default: CPU count)")
+    parser.add_argument('--no-cache', action='store_true', default=None, help="do not use the converted-file cache")
+
+    defaults = {'sort': [], 'chart_format': ["png"], 'output_dir': "reports", 'processes': os.cpu_count() or 1, 'no_cache': False}
+    known, _ = parser.parse_known_args(argv)
+    if known.job:
+        try:
+            with open(known.job, encoding='utf-8') as f:
+                spec = json.load(f)
+        except (OSError, ValueError) as e:
+            parser.error(f"cannot read the job spec: {e}")
+        unknown = set(spec) - set(JOB_SPEC_KEYS)
+        if unknown:
+            parser.error(f"unknown job spec keys: {', '.join(sorted(unknown))}")
+        if isinstance(spec.get('input'), str):
+            spec['input'] = [spec['input']]
+        defaults.update(spec)
+    args = parser.parse_args(argv)
+    for name, value in defaults.items():
+        if getattr(args, name, None) is None:
+            setattr(args, name, value)
+
+    if not args.input:
+        parser.error("an input glob is needed (--input or the job spec)")
+    if not args.sort and not args.chart:
+        parser.error("nothing to do: give sort keys, a chart type, or both")
+    if args.chart and not (args.x and args.y):
+        parser.error("a chart needs --x and --y")
+    if args.processes < 1:
+        parser.error("--processes must be at least 1")
+    return args
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        return run_batch(parse_args(argv))
+
     app = DataAnalysisApp()
-    app.root.mainloop()
\ No newline at end of file
+    app.root.mainloop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
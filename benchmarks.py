@@ -0,0 +1,372 @@
+"""Benchmarks for the scraper and data analysis tools
+
+Run one suite at a time, for example:
+
+    python benchmarks.py extract saved_page.html other_page.html
+    python benchmarks.py redraw --redraws 100
+    python benchmarks.py scrape --json baseline.json
+    python benchmarks.py scrape --baseline baseline.json
+    python benchmarks.py startup
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+def synthetic_page(items=5000, start=0):
+    """Build a large page resembling a scrolled listing"""
+    rows = []
+    for i in range(start, start + items):
+        rows.append(
+            f'<div class="item"><h3>Item {i}</h3><p>Description of item {i} with '
+            f'<b>bold</b> text &amp; an <a href="/item/{i}">inline link</a>.</p>'
+            f'<script>track({i});</script><svg><text>{i}</text></svg></div>'
+        )
+    return f"<html><head><title>Listing</title><style>p {{}}</style></head><body><h1>Listing</h1>{''.join(rows)}</body></html>"
+
+
+def time_best(func, *args, repeat=5):
+    """Return the best wall-clock time of several runs, and the last result"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def bench_extract(args):
+    """Compare the extraction backends on saved HTML fixtures"""
+    import scraper
+
+    if args.files:
+        fixtures = []
+        for path in args.files:
+            with open(path, encoding='utf-8', errors='replace') as f:
+                fixtures.append((path, f.read()))
+    else:
+        fixtures = [("synthetic listing", synthetic_page())]
+
+    backends = list(scraper.EXTRACTION_BACKENDS)
+    print(f"{'fixture':40} {'size':>10} " + ' '.join(f"{name:>10}" for name in backends) + "  identical")
+    mismatches = 0
+    for name, html in fixtures:
+        timings = []
+        outputs = []
+        for backend in backends:
+            elapsed, output = time_best(scraper.extract_structured_text, html, "", backend, repeat=args.repeat)
+            timings.append(elapsed)
+            outputs.append(output)
+        identical = all(output == outputs[0] for output in outputs)
+        mismatches += not identical
+        print(f"{name[-40:]:40} {len(html):>10} " + ' '.join(f"{t * 1000:>8.1f}ms" for t in timings) + f"  {identical}")
+    return 1 if mismatches else 0
+
+
+# Appends a batch of items each time the page is scrolled to the bottom, up to a limit
+SCROLL_PAGE_JS = """
+let batch = 0;
+window.addEventListener('scroll', () => {
+  if (batch >= %(batches)d || window.innerHeight + window.scrollY < document.body.scrollHeight - 10) return;
+  batch++;
+  for (let i = 0; i < %(items)d; i++) {
+    const n = batch * %(items)d + i;
+    const item = document.createElement('div');
+    item.innerHTML = `<h3>Item ${n}</h3><p>Description of item ${n} <a href="/item/${n}">link</a></p>`;
+    document.body.appendChild(item);
+  }
+});
+"""
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Serve generated pages: /single, /list?page=N and /scroll"""
+
+    items = 500
+    scroll_batches = 5
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        if parts.path == '/single':
+            html = synthetic_page(self.items)
+        elif parts.path == '/list':
+            page = int(parse_qs(parts.query).get('page', ['1'])[0])
+            html = synthetic_page(self.items, start=(page - 1) * self.items)
+        elif parts.path == '/scroll':
+            script = SCROLL_PAGE_JS % {'batches': self.scroll_batches, 'items': self.items}
+            html = synthetic_page(self.items).replace('</body>', f'<script>{script}</script></body>')
+        else:
+            self.send_error(404)
+            return
+        body = html.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fixture_server(items, scroll_batches):
+    """Start the fixture server on a free local port and return it"""
+    handler = type('Handler', (FixtureHandler,), {'items': items, 'scroll_batches': scroll_batches})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def bench_scrape(args):
+    """Time each scrape mode against the local fixture server, phase by phase"""
+    import scraper
+
+    server = start_fixture_server(args.items, args.scrolls)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    targets = {'single': '/single', 'multi': '/list', 'scroll': '/scroll'}
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = {(run['mode'], run['engine']): run for run in json.load(f)['runs']}
+
+    print(f"{'mode':8} {'engine':8} {'best':>10} {'median':>10} {'vs base':>8}  slowest phases")
+    runs = []
+    failures = 0
+    for mode in args.modes:
+        for engine_name in args.engines:
+            # Infinite scroll always runs in the browser
+            if mode == "scroll" and engine_name != "browser":
+                continue
+            job = scraper.make_job(base_url + targets[mode], type=mode, engine=engine_name, pages=args.pages,
+                                   scrolls=args.scrolls, wait_time=args.wait, use_cache=False)
+            engine = scraper.ScrapeEngine()
+            times = []
+            phases = None
+            error = None
+            try:
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    engine.run(job)
+                    elapsed = time.perf_counter() - start
+                    if engine.failed_pages:
+                        raise RuntimeError(f"{engine.failed_pages} page(s) failed")
+                    if not times or elapsed < min(times):
+                        phases = engine.timings.report()['phases']
+                    times.append(elapsed)
+            except Exception as e:
+                error = str(e).splitlines()[0]
+            finally:
+                engine.close()
+
+            if error:
+                # A missing Chrome only skips the browser runs
+                failures += engine_name != "browser"
+                print(f"{mode:8} {engine_name:8} {'-':>10} {'-':>10} {'':>8}  failed: {error}")
+                runs.append({'mode': mode, 'engine': engine_name, 'error': error})
+                continue
+            run = {'mode': mode, 'engine': engine_name, 'best_seconds': round(min(times), 6),
+                   'median_seconds': round(statistics.median(times), 6), 'phases': phases}
+            runs.append(run)
+            previous = baseline.get((mode, engine_name), {}).get('best_seconds')
+            change = f"{(run['best_seconds'] / previous - 1) * 100:+7.1f}%" if previous else ""
+            slowest = ', '.join(f"{name} {totals['seconds'] * 1000:.0f}ms" for name, totals in list(phases.items())[:4])
+            print(f"{mode:8} {engine_name:8} {min(times) * 1000:>8.1f}ms {run['median_seconds'] * 1000:>8.1f}ms "
+                  f"{change:>8}  {slowest}")
+    server.shutdown()
+
+    if args.json:
+        settings = {name: getattr(args, name) for name in ('items', 'pages', 'scrolls', 'wait', 'repeat')}
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'python': sys.version.split()[0], 'settings': settings, 'runs': runs}, f, indent=2)
+    return 1 if failures else 0
+
+
+# Modules each tool must not load before they are needed
+LAZY_MODULES = {
+    'scraper': ['selenium', 'webdriver_manager', 'bs4', 'requests'],
+    'autosortandgraph': ['pandas', 'numpy', 'matplotlib'],
+}
+
+
+def import_times(module):
+    """Import a module in a fresh interpreter with -X importtime
+
+    Returns the wall time of the whole process, the module's cumulative
+    import time in microseconds and {name: (depth, cumulative microseconds)}
+    for every module its import loaded that the interpreter had not already.
+    """
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    # A module's dependencies are listed, indented, right before the module itself
+    subtree = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth:
+            subtree[name.strip()] = (depth, int(cumulative))
+        elif name.strip() == module:
+            return elapsed, int(cumulative), subtree
+        else:
+            subtree = {}
+    raise RuntimeError(f"{module} missing from the -X importtime output")
+
+
+def bench_startup(args):
+    """Measure how long each tool takes to import, and check heavy modules load lazily"""
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = {run['module']: run for run in json.load(f)['runs']}
+
+    print(f"{'module':18} {'import':>9} {'process':>9} {'vs base':>8}  slowest imports")
+    runs = []
+    eager = 0
+    for module in args.modules:
+        elapsed, import_us, loaded = min((import_times(module) for _ in range(args.repeat)), key=lambda run: run[1])
+        # The tool's own imports are one level below it in the tree
+        direct = sorted(((us, name) for name, (depth, us) in loaded.items() if depth == 1), reverse=True)
+        heavy = [name for name in LAZY_MODULES.get(module, []) if name in loaded]
+        eager += bool(heavy)
+        run = {'module': module, 'import_seconds': import_us / 1e6, 'process_seconds': round(elapsed, 6),
+               'slowest_imports': {name: us / 1e6 for us, name in direct[:args.top]}, 'eager_imports': heavy}
+        runs.append(run)
+        previous = baseline.get(module, {}).get('import_seconds')
+        change = f"{(run['import_seconds'] / previous - 1) * 100:+7.1f}%" if previous else ""
+        slowest = ', '.join(f"{name} {us / 1000:.0f}ms" for us, name in direct[:args.top])
+        print(f"{module:18} {run['import_seconds'] * 1000:>7.1f}ms {elapsed * 1000:>7.1f}ms {change:>8}  {slowest}")
+        if heavy:
+            print(f"{'':18} loads {', '.join(heavy)} at startup")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'python': sys.version.split()[0], 'runs': runs}, f, indent=2)
+    return 1 if eager else 0
+
+
+def synthetic_frame(rows=50_000):
+    """Build a sales-like table with text, numeric and grouping columns"""
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'day': np.arange(rows),
+        'region': rng.choice([f"Region {i}" for i in range(40)], rows),
+        'channel': rng.choice(['Online', 'Retail', 'Partner', 'Direct'], rows),
+        'revenue': rng.gamma(2.0, 5_000.0, rows),
+    })
+
+
+def bench_redraw(args):
+    """Compare memory across redraws: a new pyplot figure each time vs one reused Figure"""
+    import gc
+    import tracemalloc
+
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    import autosortandgraph
+
+    matplotlib.rcParams['figure.max_open_warning'] = 0  # The leak is what is being measured
+    data = synthetic_frame(args.rows)
+    charts = [('bar', 'region', 'revenue', 'channel'), ('line', 'day', 'revenue', 'None'), ('pie', 'region', 'revenue', 'channel')]
+
+    def new_figure_each_time(i):
+        # The previous draw_graph: plt.subplots per redraw, never closed
+        graph_type, x_axis, y_axis, group_column = charts[i % len(charts)]
+        fig, ax = plt.subplots(figsize=(12, 8))
+        lines = autosortandgraph.draw_chart(ax, graph_type, data, x_axis, y_axis, group_column)
+        fig.canvas.draw()
+        return lines
+
+    figure = Figure(figsize=(12, 8))
+    FigureCanvasAgg(figure)
+
+    def reused_figure(i):
+        graph_type, x_axis, y_axis, group_column = charts[i % len(charts)]
+        figure.clear()
+        ax = figure.add_subplot()
+        lines = autosortandgraph.draw_chart(ax, graph_type, data, x_axis, y_axis, group_column)
+        figure.canvas.draw()
+        return lines
+
+    checkpoints = sorted({1, 10, args.redraws // 2, args.redraws})
+    print(f"{'strategy':24} " + ' '.join(f"{'@' + str(c):>9}" for c in checkpoints) + f" {'ms/redraw':>10}")
+    growth = {}
+    for name, redraw in [("new figure each time", new_figure_each_time), ("reused figure", reused_figure)]:
+        gc.collect()
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        usage = []
+        start = time.perf_counter()
+        for i in range(1, args.redraws + 1):
+            redraw(i - 1)
+            if i in checkpoints:
+                gc.collect()
+                usage.append((tracemalloc.get_traced_memory()[0] - base) / (1024 * 1024))
+        elapsed = time.perf_counter() - start
+        tracemalloc.stop()
+        plt.close('all')
+        growth[name] = usage[-1] - usage[0]
+        print(f"{name:24} " + ' '.join(f"{mb:>7.1f}MB" for mb in usage) + f" {elapsed * 1000 / args.redraws:>10.1f}")
+    # Memory of the reused figure should stay flat after the first redraw
+    return 0 if growth["reused figure"] < 5 else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    suites = parser.add_subparsers(dest='suite', required=True)
+
+    extract = suites.add_parser('extract', help="compare HTML extraction backends")
+    extract.add_argument('files', nargs='*', help="saved HTML pages (defaults to a synthetic listing)")
+    extract.add_argument('--repeat', type=int, default=5, help="runs per backend, best time is reported")
+    extract.set_defaults(func=bench_extract)
+
+    redraw = suites.add_parser('redraw', help="measure chart memory across consecutive redraws")
+    redraw.add_argument('--redraws', type=int, default=100, help="number of consecutive redraws")
+    redraw.add_argument('--rows', type=int, default=50_000, help="rows in the synthetic table")
+    redraw.set_defaults(func=bench_redraw)
+
+    scrape = suites.add_parser('scrape', help="time the scrape modes against a local fixture server")
+    scrape.add_argument('--modes', nargs='+', choices=['single', 'multi', 'scroll'], default=['single', 'multi', 'scroll'])
+    scrape.add_argument('--engines', nargs='+', choices=['static', 'browser'], default=['static', 'browser'])
+    scrape.add_argument('--items', type=int, default=500, help="items per fixture page or scroll batch")
+    scrape.add_argument('--pages', type=int, default=5, help="pages scraped in multi mode")
+    scrape.add_argument('--scrolls', type=int, default=5, help="scroll batches the scroll fixture loads")
+    scrape.add_argument('--wait', type=float, default=2.0, help="max seconds to wait per scroll")
+    scrape.add_argument('--repeat', type=int, default=3, help="runs per mode, best and median are reported")
+    scrape.add_argument('--json', help="write the results, with per-phase timings, to this file")
+    scrape.add_argument('--baseline', help="earlier --json results to compare best times against")
+    scrape.set_defaults(func=bench_scrape)
+
+    startup = suites.add_parser('startup', help="measure import time of each tool with -X importtime")
+    startup.add_argument('--modules', nargs='+', default=list(LAZY_MODULES), help="modules to import")
+    startup.add_argument('--repeat', type=int, default=5, help="fresh interpreters per module, the fastest is reported")
+    startup.add_argument('--top', type=int, default=4, help="slowest direct imports to list")
+    startup.add_argument('--json', help="write the results to this file")
+    startup.add_argument('--baseline', help="earlier --json results to compare import times against")
+    startup.set_defaults(func=bench_startup)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
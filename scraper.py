@@ -1,15 +1,1910 @@
+import argparse
+import hashlib
+import json
+import math
 import os
+import queue
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
 import time
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlsplit, urlunsplit
 from tkinter import *
 from tkinter import ttk, filedialog, messagebox
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+
+# requests, bs4, selenium, webdriver_manager, urllib.robotparser and the profiler are
+# imported where they are first needed, so the window and the command line start without them
+
+
+# URL patterns never needed for text extraction, blocked through the DevTools protocol
+BLOCKED_MEDIA_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico", "*.bmp",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp4", "*.webm", "*.ogg", "*.mp3", "*.wav", "*.m3u8",
+]
+BLOCKED_TRACKER_URLS = [
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*googlesyndication.com*",
+    "*facebook.net*", "*connect.facebook.com*", "*hotjar.com*", "*segment.io*", "*segment.com/analytics*",
+    "*scorecardresearch.com*", "*quantserve.com*", "*adsystem.com*", "*criteo.com*", "*taboola.com*",
+    "*outbrain.com*", "*newrelic.com*", "*nr-data.net*", "*clarity.ms*",
+]
+BLOCKED_STYLESHEET_URLS = ["*.css"]
+
+# What a page load may download. "full" is the browser's normal load. "lean" keeps
+# scripts and stylesheets so pages render and scroll normally, but returns at
+# DOMContentLoaded, so content a page only adds after its load event can be
+# missing; "minimal" also drops stylesheets, which can break infinite scroll on
+# layouts that need them. The trimmed profiles log network events by default so
+# the summary shows what they saved; "full" only logs them when stats are asked for.
+LOAD_PROFILES = {
+    'full': {'blocked_urls': [], 'page_load_strategy': "normal", 'images': True, 'network_log': False},
+    'lean': {'blocked_urls': BLOCKED_MEDIA_URLS + BLOCKED_TRACKER_URLS, 'page_load_strategy': "eager", 'images': False,
+             'network_log': True},
+    'minimal': {'blocked_urls': BLOCKED_MEDIA_URLS + BLOCKED_TRACKER_URLS + BLOCKED_STYLESHEET_URLS,
+                'page_load_strategy': "eager", 'images': False, 'network_log': True},
+}
+DEFAULT_LOAD_PROFILE = "full"
+
+
+def build_chrome_options(profile=DEFAULT_LOAD_PROFILE, network_log=False):
+    """Build the headless Chrome options shared by every driver"""
+    from selenium.webdriver.chrome.options import Options
+
+    settings = LOAD_PROFILES[profile]
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--no-sandbox")
+    # "eager" returns from get() at DOMContentLoaded instead of waiting for the load event
+    chrome_options.page_load_strategy = settings['page_load_strategy']
+    if not settings['images']:
+        chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+        chrome_options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    if network_log:
+        # DevTools network events, read back by NetworkStats after each page
+        chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    return chrome_options
+
+
+def create_chrome_driver(driver_path, profile=DEFAULT_LOAD_PROFILE, network_log=False):
+    """Start a headless Chrome with a load profile's options and URL blocking applied"""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+
+    driver = webdriver.Chrome(service=Service(driver_path), options=build_chrome_options(profile, network_log))
+    blocked_urls = LOAD_PROFILES[profile]['blocked_urls']
+    if blocked_urls:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": blocked_urls})
+    return driver
+
+
+# How long a resolved chromedriver path is reused before webdriver_manager checks for a newer driver
+DRIVER_PATH_TTL = 24 * 3600
+_driver_path_lock = threading.Lock()
+_driver_path = None
+
+
+def scraper_cache_dir():
+    """Return the per-user cache directory, creating it if needed"""
+    cache_dir = os.path.join(os.path.expanduser("~"), ".cache", "advanced-web-scraper")
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def chromedriver_path(refresh=False):
+    """Return (path, cached) for the chromedriver binary
+
+    ChromeDriverManager().install() checks online for the driver matching the
+    installed Chrome, so its answer is kept for the process and on disk for
+    DRIVER_PATH_TTL. refresh=True resolves the driver again.
+    """
+    global _driver_path
+    with _driver_path_lock:
+        if _driver_path and not refresh:
+            return _driver_path, True
+        record_path = os.path.join(scraper_cache_dir(), "chromedriver.json")
+        if not refresh:
+            try:
+                with open(record_path, encoding='utf-8') as f:
+                    record = json.load(f)
+                if time.time() - record['resolved_at'] < DRIVER_PATH_TTL and os.access(record['path'], os.X_OK):
+                    _driver_path = record['path']
+                    return _driver_path, True
+            except (OSError, ValueError, KeyError, TypeError):
+                pass
+
+        from webdriver_manager.chrome import ChromeDriverManager
+
+        _driver_path = ChromeDriverManager().install()
+        try:
+            with open(record_path, 'w', encoding='utf-8') as f:
+                json.dump({'path': _driver_path, 'resolved_at': time.time()}, f)
+        except OSError:
+            pass
+        return _driver_path, False
+
+
+def launch_chrome(profile=DEFAULT_LOAD_PROFILE, timings=None, network_log=False):
+    """Start a headless Chrome, re-resolving a cached chromedriver once if it fails to start"""
+    timings = timings or PhaseTimings()
+    with timings.phase('driver_install'):
+        driver_path, cached = chromedriver_path()
+    try:
+        with timings.phase('driver_start'):
+            return create_chrome_driver(driver_path, profile, network_log)
+    except Exception:
+        # Chrome may have been updated past the cached driver's version
+        if not cached:
+            raise
+    with timings.phase('driver_install'):
+        driver_path, _ = chromedriver_path(refresh=True)
+    with timings.phase('driver_start'):
+        return create_chrome_driver(driver_path, profile, network_log)
+
+
+class NetworkStats:
+    """Requests, blocked requests and bytes downloaded by the browsers, from their DevTools logs"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.pages = 0
+            self.requests = 0
+            self.blocked = 0
+            self.bytes = 0
+
+    def record(self, driver, new_page=True):
+        """Add the network events a driver logged since the last call
+
+        They count as one more page load unless new_page is False, as for the
+        requests an infinite scroll makes on the page it already loaded.
+        """
+        try:
+            entries = driver.get_log("performance")
+        except Exception:
+            return
+        requests = blocked = received = 0
+        for entry in entries:
+            message = json.loads(entry['message'])['message']
+            method = message.get('method')
+            if method == "Network.requestWillBeSent":
+                requests += 1
+            elif method == "Network.loadingFinished":
+                received += message['params'].get('encodedDataLength', 0)
+            elif method == "Network.loadingFailed" and message['params'].get('blockedReason'):
+                blocked += 1
+        with self._lock:
+            self.pages += new_page
+            self.requests += requests
+            self.blocked += blocked
+            self.bytes += int(received)
+
+    def __str__(self):
+        if not self.pages:
+            return "no browser page loads"
+        return (f"browser: {self.pages} page loads, {self.bytes / self.pages / 1024:.0f} KB and "
+                f"{(self.requests - self.blocked) / self.pages:.0f} requests per page, "
+                f"{self.blocked / self.pages:.0f} requests per page blocked")
+
+
+class PhaseTimings:
+    """Time and bytes spent in each phase of a scrape, in total and per page
+
+    Phases are driver_install, driver_start, navigate, wait, page_source,
+    http_fetch, extract, scroll_wait, added_nodes, and in the window output and
+    display. Times of fetches running in parallel add up, so totals can exceed
+    the job's wall time. Sizes of HTML already decoded to text are counted in
+    characters.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.phases = {}
+            self.pages = {}
+
+    @contextmanager
+    def phase(self, name, url=None):
+        """Time the enclosed block; setting sample['bytes'] inside it records a size"""
+        sample = {'bytes': 0}
+        start = time.perf_counter()
+        try:
+            yield sample
+        finally:
+            self.add(name, time.perf_counter() - start, sample['bytes'], url)
+
+    def add(self, name, seconds, size=0, url=None):
+        with self._lock:
+            targets = [self.phases, self.pages.setdefault(url, {})] if url else [self.phases]
+            for phases in targets:
+                totals = phases.setdefault(name, {'calls': 0, 'seconds': 0.0, 'bytes': 0})
+                totals['calls'] += 1
+                totals['seconds'] += seconds
+                totals['bytes'] += size
+
+    @staticmethod
+    def _ranked(phases):
+        ranked = sorted(phases.items(), key=lambda item: -item[1]['seconds'])
+        return {name: dict(totals, seconds=round(totals['seconds'], 6)) for name, totals in ranked}
+
+    def report(self):
+        """Return the phase totals and per-page phases as a JSON-serialisable dict"""
+        with self._lock:
+            return {
+                'phases': self._ranked(self.phases),
+                'pages': [{'url': url, 'phases': self._ranked(phases)} for url, phases in self.pages.items()],
+            }
+
+    def __str__(self):
+        ranked = self._ranked(self.phases)
+        if not ranked:
+            return "no timed phases"
+        return "time by phase: " + ", ".join(f"{name} {totals['seconds']:.2f}s" for name, totals in list(ranked.items())[:6])
+
+
+def profile_summary(profilers, limit=25):
+    """Return the functions with the most cumulative time across cProfile runs"""
+    import pstats
+
+    if not profilers:
+        return []
+    stats = pstats.Stats(*profilers)
+    rows = sorted(stats.stats.items(), key=lambda item: -item[1][3])[:limit]
+    return [{
+        'function': f"{os.path.basename(filename)}:{line}({function})",
+        'calls': calls,
+        'total_seconds': round(total, 6),
+        'cumulative_seconds': round(cumulative, 6),
+    } for (filename, line, function), (_, calls, total, cumulative, _) in rows]
+
+
+def call_profiled(profilers, function, *args):
+    """Call function under a new cProfile profiler for this thread, appended to profilers
+
+    Before Python 3.12 a profiler only sees the thread that enabled it, so work
+    handed to pool and crawl threads needs its own. From 3.12 one profiler sees
+    every thread and a second cannot start, so function then runs unprofiled
+    here and is covered by the job's profiler.
+    """
+    import cProfile
+
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        return function(*args)
+    try:
+        return function(*args)
+    finally:
+        profiler.disable()
+        profilers.append(profiler)
+
+
+def timing_report(timings, profilers=(), **details):
+    """Build the JSON timing report of a job or batch"""
+    report = {
+        'created': time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        'python': sys.version.split()[0],
+    }
+    report.update(details)
+    report.update(timings.report())
+    if profilers:
+        report['profile'] = profile_summary(profilers)
+    return report
+
+
+class DriverPool:
+    """Bounded pool of long-lived headless Chrome drivers that fetch pages in parallel
+
+    Callers waiting for a driver are woken when one is returned or when a broken
+    one frees room to start a replacement. Drivers still in use when the pool is
+    closed are quit as they are returned. Network events are only logged for
+    NetworkStats when network_log is set, by default for the trimmed load profiles.
+    """
+
+    def __init__(self, size=4, page_timeout=10, profile=DEFAULT_LOAD_PROFILE, network=None, timings=None,
+                 network_log=None):
+        self.size = max(1, size)
+        self.page_timeout = page_timeout
+        self.profile = profile
+        self.network_log = LOAD_PROFILES[profile]['network_log'] if network_log is None else network_log
+        self.network = network or NetworkStats()
+        self.timings = timings or PhaseTimings()
+        self._idle = deque()
+        self._available = threading.Condition()
+        self._created = 0
+        self._closed = False
+        self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="scraper")
+
+    def _create_driver(self):
+        """Start a new Chrome instance"""
+        return launch_chrome(self.profile, self.timings, self.network_log)
+
+    def acquire(self, cancel_event=None):
+        """Borrow an idle driver, starting a new one while under the size limit
+
+        Blocks until a driver is free, raising JobCancelled if cancel_event is
+        set while waiting.
+        """
+        with self._available:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Browser pool is closed")
+                if self._idle:
+                    return self._idle.popleft()
+                if self._created < self.size:
+                    self._created += 1
+                    break
+                if cancel_event and cancel_event.is_set():
+                    raise JobCancelled()
+                self._available.wait(POLL_INTERVAL_MS / 1000 if cancel_event else None)
+
+        try:
+            return self._create_driver()
+        except Exception:
+            with self._available:
+                self._created -= 1
+                self._available.notify()
+            raise
+
+    def release(self, driver, broken=False):
+        """Return a driver to the pool, or discard it if its session is unusable"""
+        with self._available:
+            if not broken and not self._closed:
+                self._idle.append(driver)
+                self._available.notify()
+                return
+            # Let a waiting caller start a replacement
+            self._created -= 1
+            self._available.notify()
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def fetch_html(self, url, cancel_event=None):
+        """Load a URL on a pooled driver and return its page source"""
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        driver = self.acquire(cancel_event)
+        broken = False
+        try:
+            with self.timings.phase('navigate', url):
+                driver.get(url)
+            with self.timings.phase('wait', url):
+                WebDriverWait(driver, self.page_timeout).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+            with self.timings.phase('page_source', url) as sample:
+                html = driver.page_source
+                sample['bytes'] = len(html)
+            if self.network_log:
+                self.network.record(driver)
+            return html
+        except TimeoutException:
+            raise
+        except Exception:
+            broken = True
+            raise
+        finally:
+            self.release(driver, broken)
+
+    def fetch(self, url, static_fetcher=None, cache=None):
+        """Load a URL through the cache and static fetcher, using a pooled driver last
+
+        A browser is only started if the page is not cached and the plain HTTP
+        response (when a static fetcher is given) looks JavaScript-rendered.
+        """
+        return load_page(url, self.fetch_html, static_fetcher, cache)
+
+    def submit(self, url, static_fetcher=None, cache=None, profilers=None):
+        """Schedule a fetch on the pool and return its future
+
+        With profilers, the fetch is profiled on its worker thread (see call_profiled).
+        """
+        if profilers:
+            return self._executor.submit(call_profiled, profilers, self.fetch, url, static_fetcher, cache)
+        return self._executor.submit(self.fetch, url, static_fetcher, cache)
+
+    def close(self):
+        """Stop the worker threads and quit every driver, waiting for fetches in progress"""
+        with self._available:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._created -= len(idle)
+            self._available.notify_all()
+        for driver in idle:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        # Drivers still in use are quit by release() as their fetches finish
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _accept_encoding():
+    """Advertise brotli only when urllib3 is able to decode it"""
+    try:
+        import brotli  # noqa: F401
+    except ImportError:
+        try:
+            import brotlicffi  # noqa: F401
+        except ImportError:
+            return "gzip, deflate"
+    return "gzip, deflate, br"
+
+
+# Markers of pages whose content is rendered client-side
+JS_APP_ROOT = re.compile(
+    r'<(div|main)[^>]+id=["\']?(root|app|__next|__nuxt|svelte)["\']?[^>]*>\s*</\1>'
+    r'|<app-root[^>]*>\s*</app-root>'
+    r'|<noscript[^>]*>[^<]*(enable|requires?) javascript',
+    re.IGNORECASE,
+)
+SCRIPTS = re.compile(r'<script\b.*?</script\s*>', re.IGNORECASE | re.DOTALL)
+NON_CONTENT = re.compile(r'<(script|style|noscript|svg)\b.*?</\1\s*>|<!--.*?-->', re.IGNORECASE | re.DOTALL)
+TAGS = re.compile(r'<[^>]+>')
+META_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.IGNORECASE)
+
+
+def looks_js_rendered(html, min_text_length=200):
+    """Guess whether a page needs a browser to produce its content"""
+    if JS_APP_ROOT.search(html):
+        return True
+
+    # Little visible text next to a lot of script usually means a client-side app
+    script_length = sum(len(m.group(0)) for m in SCRIPTS.finditer(html))
+    visible_text = ''.join(TAGS.sub(' ', NON_CONTENT.sub(' ', html)).split())
+    return len(visible_text) < min_text_length and script_length > len(visible_text)
+
+
+class FetchedPage:
+    """HTML for one URL, its extracted output if already known, and cache validators"""
+
+    def __init__(self, url, html, output=None, etag=None, last_modified=None, source='browser'):
+        self.url = url
+        self.html = html
+        self.output = output
+        self.etag = etag
+        self.last_modified = last_modified
+        self.source = source
+
+
+class PageCache:
+    """On-disk cache of fetched HTML and extracted output, keyed by URL
+
+    Entries younger than ttl seconds are served without any request. Older
+    entries are revalidated with ETag/Last-Modified when the static fetcher is
+    used, and the least recently used entries are evicted once the cache grows
+    past max_bytes.
+    """
+
+    def __init__(self, path=None, ttl=3600, max_bytes=200 * 1024 * 1024):
+        if path is None:
+            path = os.path.join(scraper_cache_dir(), "pages.sqlite3")
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS pages (url TEXT PRIMARY KEY, html TEXT, output TEXT, "
+            "etag TEXT, last_modified TEXT, fetched_at REAL, accessed_at REAL, size INTEGER)"
+        )
+        self._db.commit()
+
+    def get(self, url):
+        """Return the cached page for a URL, or None"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT html, output, etag, last_modified, fetched_at FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (time.time(), url))
+            self._db.commit()
+
+        page = FetchedPage(url, row[0], row[1], row[2], row[3], source='cache')
+        page.fetched_at = row[4]
+        return page
+
+    def is_fresh(self, page):
+        return time.time() - page.fetched_at < self.ttl
+
+    def put(self, page, output):
+        """Store a freshly fetched page and its extracted output"""
+        now = time.time()
+        size = len(page.html) + len(output)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (page.url, page.html, output, page.etag, page.last_modified, now, now, size),
+            )
+            self._evict()
+            self._db.commit()
+
+    def refresh(self, page):
+        """Mark a revalidated entry as fresh again"""
+        with self._lock:
+            self._db.execute(
+                "UPDATE pages SET etag = ?, last_modified = ?, fetched_at = ? WHERE url = ?",
+                (page.etag, page.last_modified, time.time(), page.url),
+            )
+            self._db.commit()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        stale = []
+        for url, size in self._db.execute("SELECT url, size FROM pages ORDER BY accessed_at"):
+            if total <= self.max_bytes:
+                break
+            stale.append((url,))
+            total -= size
+        self._db.executemany("DELETE FROM pages WHERE url = ?", stale)
+
+    def count(self, outcome):
+        """Record a lookup outcome: 'hits', 'revalidated' or 'misses'"""
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def reset_stats(self):
+        self.hits = self.revalidated = self.misses = 0
+
+    def stats(self):
+        return f"Cache: {self.hits + self.revalidated} hits ({self.revalidated} revalidated), {self.misses} misses"
+
+    def close(self):
+        self._db.close()
+
+
+def load_page(url, browser_fetch, static_fetcher=None, cache=None):
+    """Fetch a page through the cache, the static HTTP client and the browser, in that order
+
+    browser_fetch is called with the URL and must return rendered HTML. The
+    returned page carries its cached output when the page has not changed.
+    """
+    cached = cache.get(url) if cache else None
+    if cached and cache.is_fresh(cached):
+        cache.count('hits')
+        return cached
+
+    if static_fetcher:
+        page = static_fetcher.fetch_if_static(url, cached)
+        if page is not None:
+            if cache and page.source == 'revalidated':
+                cache.refresh(page)
+                cache.count('revalidated')
+            elif cache:
+                cache.count('misses')
+            return page
+
+    if cache:
+        cache.count('misses')
+    return FetchedPage(url, browser_fetch(url))
+
+
+class StaticFetcher:
+    """Pooled keep-alive HTTP client for pages that render without JavaScript"""
+
+    def __init__(self, pool_size=10, timeout=10, timings=None):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.timeout = timeout
+        self.timings = timings or PhaseTimings()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AdvancedWebScraper/1.0",
+            "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8",
+            "Accept-Encoding": _accept_encoding(),
+        })
+
+    def fetch(self, url, cached=None):
+        """Download a page, revalidating a cached copy with ETag/Last-Modified if given"""
+        headers = {}
+        if cached and cached.etag:
+            headers['If-None-Match'] = cached.etag
+        if cached and cached.last_modified:
+            headers['If-Modified-Since'] = cached.last_modified
+
+        with self.timings.phase('http_fetch', url) as sample:
+            response = self.session.get(url, timeout=self.timeout, headers=headers)
+            sample['bytes'] = len(response.content)
+        if response.status_code == 304 and cached:
+            return FetchedPage(url, cached.html, cached.output,
+                               response.headers.get('ETag', cached.etag),
+                               response.headers.get('Last-Modified', cached.last_modified),
+                               source='revalidated')
+        response.raise_for_status()
+
+        # requests assumes ISO-8859-1 without a charset header, so check the markup instead
+        if 'charset' not in response.headers.get('Content-Type', '').lower():
+            match = META_CHARSET.search(response.content[:4096])
+            response.encoding = match.group(1).decode('ascii') if match else 'utf-8'
+        return FetchedPage(url, response.text, etag=response.headers.get('ETag'),
+                           last_modified=response.headers.get('Last-Modified'), source='static')
+
+    def fetch_if_static(self, url, cached=None):
+        """Return the fetched page, or None if it has to be rendered in a browser"""
+        page = self.fetch(url, cached)
+        if page.source == 'static' and looks_js_rendered(page.html):
+            return None
+        return page
+
+    def close(self):
+        """Close all pooled connections"""
+        self.session.close()
+
+
+# Tags dropped before extraction, and the tags turned into Markdown lines
+REMOVED_TAGS = frozenset(['script', 'style', 'noscript', 'meta', 'link', 'svg'])
+CONTENT_TAGS = frozenset(['h1', 'h2', 'h3', 'p', 'a'])
+
+# BeautifulSoup's html.parser builder treats these tags specially, and the
+# streaming extractor has to do the same to produce identical text
+VOID_TAGS = frozenset([
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link',
+    'menuitem', 'meta', 'param', 'source', 'track', 'wbr',
+    'basefont', 'bgsound', 'command', 'frame', 'image', 'isindex', 'nextid', 'spacer',
+])
+STRING_CONTAINER_TAGS = frozenset(['rt', 'rp', 'style', 'script', 'template'])
+
+
+def format_content_line(name, text, href):
+    """Format one heading, paragraph or link as Markdown"""
+    if name.startswith('h'):
+        level = int(name[1])
+        return f"{'#' * level} {text}"
+    elif name == 'p':
+        return f"\n{text}\n"
+    return f"[{text}]({href})"
+
+
+def extract_with_bs4(html):
+    """Extract content lines by building a full BeautifulSoup tree"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+
+    # Remove unwanted elements
+    for tag in soup(list(REMOVED_TAGS)):
+        tag.decompose()
+
+    output_lines = []
+
+    # Example structure: H1-H6, Paragraphs, and Links
+    for tag in soup.find_all(list(CONTENT_TAGS)):
+        text = tag.get_text(strip=True)
+        if not text:
+            continue
+        output_lines.append(format_content_line(tag.name, text, tag.get('href')))
+
+    return output_lines
+
+
+# The leading digits of a numeric character reference html.parser passed on unterminated
+DECIMAL_CHARREF = re.compile(r"^([0-9]+)(.*)", re.DOTALL)
+HEX_CHARREF = re.compile(r"^([0-9a-f]+)(.*)", re.DOTALL)
+
+
+def decode_charref(name):
+    """Decode a numeric character reference as BeautifulSoup's html.parser builder does
+
+    Returns (character, text that followed an unterminated reference). Like the
+    HTML spec, invalid code points become U+FFFD and C1 controls are read as
+    Windows-1252.
+    """
+    base, digits, pattern = 10, name, DECIMAL_CHARREF
+    if name[:1] in ('x', 'X'):
+        base, digits, pattern = 16, name[1:], HEX_CHARREF
+    extra = ""
+    try:
+        number = int(digits, base)
+    except ValueError:
+        match = pattern.search(digits)
+        if match is None:
+            return "", digits
+        number = int(match.group(1), base)
+        extra = match.group(2)
+
+    if number == 0 or number > 0x10FFFF or 0xD800 <= number <= 0xDFFF:
+        return "\ufffd", extra
+    if 0x80 <= number <= 0x9F:
+        try:
+            return bytes([number]).decode('cp1252'), extra
+        except UnicodeDecodeError:
+            pass
+    return chr(number), extra
+
+
+class StreamingExtractor(HTMLParser):
+    """Single-pass extractor that produces the BeautifulSoup output without building a tree
+
+    It replays the html.parser tree builder's rules for closing tags, void
+    elements, entity handling and string boundaries, so every heading,
+    paragraph and link gets exactly the text get_text(strip=True) would give.
+    """
+
+    def __init__(self):
+        from bs4.dammit import EntitySubstitution
+
+        super().__init__(convert_charrefs=False)
+        self.entities = EntitySubstitution.HTML_ENTITY_TO_CHARACTER
+        self.stack = []
+        self.open_counts = {}
+        self.already_closed = []
+        self.current_data = []
+        self.removed_depth = 0
+        self.container_depth = 0
+        self.active_slots = []
+        self.slots = []
+
+    def extract(self, html):
+        """Parse a whole document and return its content lines"""
+        self.feed(html)
+        self.close()
+        self.flush()
+        while self.stack:
+            self.pop()
+
+        output_lines = []
+        for name, href, parts in self.slots:
+            text = ''.join(parts)
+            if text:
+                output_lines.append(format_content_line(name, text, href))
+        return output_lines
+
+    def flush(self):
+        """End the current string, crediting it to every open content tag"""
+        if not self.current_data:
+            return
+        text = ''.join(self.current_data).strip()
+        self.current_data = []
+        if text and not self.removed_depth and not self.container_depth:
+            for parts in self.active_slots:
+                parts.append(text)
+
+    def add_cdata(self, text):
+        """Credit a CDATA section, which counts as text even inside string containers"""
+        text = text.strip()
+        if text and not self.removed_depth:
+            for parts in self.active_slots:
+                parts.append(text)
+
+    def push(self, name, attrs):
+        slot = None
+        if name in CONTENT_TAGS and not self.removed_depth:
+            href = None
+            if name == 'a':
+                for key, value in attrs:
+                    if key == 'href':
+                        href = '' if value is None else value
+            slot = []
+            self.slots.append((name, href, slot))
+            self.active_slots.append(slot)
+
+        self.stack.append((name, slot))
+        self.open_counts[name] = self.open_counts.get(name, 0) + 1
+        if name in REMOVED_TAGS:
+            self.removed_depth += 1
+        if name in STRING_CONTAINER_TAGS:
+            self.container_depth += 1
+
+    def pop(self):
+        name, slot = self.stack.pop()
+        self.open_counts[name] -= 1
+        if slot is not None:
+            self.active_slots.pop()
+        if name in REMOVED_TAGS:
+            self.removed_depth -= 1
+        if name in STRING_CONTAINER_TAGS:
+            self.container_depth -= 1
+
+    def close_tag(self, name):
+        """Pop up to and including the most recent open tag with this name"""
+        self.flush()
+        if not self.open_counts.get(name):
+            return
+        while self.stack:
+            popped = self.stack[-1][0]
+            self.pop()
+            if popped == name:
+                break
+
+    def handle_starttag(self, tag, attrs, handle_empty_element=True):
+        self.flush()
+        self.push(tag, attrs)
+        if tag in VOID_TAGS and handle_empty_element:
+            self.close_tag(tag)
+            self.already_closed.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs, handle_empty_element=False)
+        self.close_tag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in self.already_closed:
+            self.already_closed.remove(tag)
+        else:
+            self.close_tag(tag)
+
+    def handle_data(self, data):
+        self.current_data.append(data)
+
+    def handle_charref(self, name):
+        character, extra_data = decode_charref(name)
+        self.current_data.append(character)
+        self.current_data.append(extra_data)
+
+    def handle_entityref(self, name):
+        character = self.entities.get(name)
+        self.current_data.append(character if character is not None else f"&{name}")
+
+    def handle_comment(self, data):
+        self.flush()
+
+    def handle_decl(self, decl):
+        self.flush()
+
+    def handle_pi(self, data):
+        self.flush()
+
+    def unknown_decl(self, data):
+        self.flush()
+        if data.upper().startswith("CDATA["):
+            self.add_cdata(data[len("CDATA["):])
+
+
+def extract_with_stream(html):
+    """Extract content lines in one pass with StreamingExtractor"""
+    return StreamingExtractor().extract(html)
+
+
+EXTRACTION_BACKENDS = {
+    'stream': extract_with_stream,
+    'bs4': extract_with_bs4,
+}
+DEFAULT_EXTRACTION_BACKEND = 'stream'
+
+
+def extract_structured_text(html, prefix="", backend=None):
+    """Convert page HTML into Markdown-style headings, paragraphs and links
+
+    Falls back to BeautifulSoup if the selected backend cannot handle the page.
+    """
+    extract = EXTRACTION_BACKENDS.get(backend or DEFAULT_EXTRACTION_BACKEND, extract_with_bs4)
+    try:
+        output_lines = extract(html)
+    except Exception:
+        if extract is extract_with_bs4:
+            raise
+        output_lines = extract_with_bs4(html)
+
+    if prefix:
+        output_lines.insert(0, prefix)
+    return '\n'.join(output_lines)
+
+
+class OutputSink:
+    """Append each page's output to a file on disk as soon as it is produced
+
+    Records are written as plain text (the classic "=== PAGE n ===" layout),
+    JSON Lines, or Markdown. Without an explicit path the sink spools to a
+    temporary file, which save_to copies to its final destination.
+    """
+
+    FORMATS = {
+        'txt': ("Text Files", ".txt"),
+        'jsonl': ("JSON Lines", ".jsonl"),
+        'md': ("Markdown", ".md"),
+    }
+
+    def __init__(self, fmt='txt', path=None):
+        if fmt not in self.FORMATS:
+            raise ValueError(f"Unknown output format: {fmt}")
+        self.format = fmt
+        self.temporary = path is None
+        if self.temporary:
+            fd, path = tempfile.mkstemp(prefix="scrape-", suffix=self.FORMATS[fmt][1])
+            self.file = os.fdopen(fd, 'w', encoding='utf-8')
+        else:
+            self.file = open(path, 'w', encoding='utf-8')
+        self.path = path
+        self.records = 0
+
+    def write(self, content, label="", url=None):
+        """Write one page (or scroll batch) of extracted content"""
+        if self.format == 'jsonl':
+            self.file.write(json.dumps({'label': label, 'url': url, 'content': content}, ensure_ascii=False) + "\n")
+        elif self.format == 'md':
+            heading = f"## {label}\n\n" if label else ""
+            self.file.write(f"{heading}{content}\n\n")
+        else:
+            lines = [f"\n=== {label} ===\n"] if label else []
+            if content:
+                lines.append(content)
+            self.file.write('\n'.join(lines) + "\n")
+        self.file.flush()
+        self.records += 1
+
+    def save_to(self, path):
+        """Copy everything written so far to another file"""
+        self.file.flush()
+        shutil.copyfile(self.path, path)
+
+    def close(self):
+        """Close the file, deleting it if it was only a temporary spool"""
+        if not self.file.closed:
+            self.file.close()
+        if self.temporary and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+# Record element nodes added to the page so scrolls can be extracted incrementally, and
+# return the page as it was when recording started
+INSTALL_MUTATION_OBSERVER_JS = """
+if (!window.__scraperAddedNodes) {
+    window.__scraperAddedNodes = [];
+    new MutationObserver(function (mutations) {
+        for (const mutation of mutations) {
+            for (const node of mutation.addedNodes) {
+                if (node.nodeType === Node.ELEMENT_NODE) {
+                    window.__scraperAddedNodes.push(node);
+                }
+            }
+        }
+    }).observe(document.body, {childList: true, subtree: true});
+}
+return document.documentElement.outerHTML;
+"""
+
+# Return the markup of the outermost nodes added since the last call, then reset
+TAKE_ADDED_NODES_JS = """
+const added = new Set(window.__scraperAddedNodes || []);
+window.__scraperAddedNodes = [];
+const roots = [];
+for (const node of added) {
+    let nested = false;
+    for (let parent = node.parentNode; parent; parent = parent.parentNode) {
+        if (added.has(parent)) {
+            nested = true;
+            break;
+        }
+    }
+    if (!nested && node.isConnected) {
+        roots.push(node.outerHTML);
+    }
+}
+return roots.join("");
+"""
+
+# How often the Tk thread drains progress messages from the worker
+POLL_INTERVAL_MS = 100
+
+# The output view only keeps this many recent lines; the full results live in the sink
+OUTPUT_VIEW_LINES = 2000
+
+
+class JobCancelled(Exception):
+    """Raised inside a scrape job when the user presses Cancel"""
+
+
+SCROLL_HEIGHT_JS = "return document.body.scrollHeight"
+
+# Count fetch/XHR requests in flight and note when the network was last active (any
+# request starting or finishing, or any resource loading), installing the hooks on
+# first call; returns [requests in flight, seconds since the last activity]
+NETWORK_ACTIVITY_JS = """
+const network = window.__scraperNetwork || (function () {
+    const state = window.__scraperNetwork = {pending: 0, last: performance.now()};
+    const started = function () {
+        state.pending++;
+        state.last = performance.now();
+    };
+    const finished = function () {
+        state.pending = Math.max(0, state.pending - 1);
+        state.last = performance.now();
+    };
+    if (window.fetch) {
+        const fetch = window.fetch;
+        window.fetch = function () {
+            started();
+            return fetch.apply(this, arguments).finally(finished);
+        };
+    }
+    const send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        started();
+        this.addEventListener('loadend', finished, {once: true});
+        return send.apply(this, arguments);
+    };
+    if (window.PerformanceObserver) {
+        new PerformanceObserver(function () {
+            state.last = performance.now();
+        }).observe({type: 'resource'});
+    }
+    return state;
+})();
+return [network.pending, (performance.now() - network.last) / 1000];
+"""
+
+# Quiet network time after a scroll that is taken as the end of the feed
+SCROLL_IDLE_SECONDS = 1.0
+
+
+def wait_for_scroll_growth(driver, last_height, max_wait, cancel_event=None,
+                           first_poll=0.1, idle_time=SCROLL_IDLE_SECONDS):
+    """Wait until the page grows after a scroll, polling with exponential backoff
+
+    Returns (new_height, seconds_waited). It returns as soon as the scroll height
+    changes, or once no fetch/XHR request is in flight and the network has been
+    quiet for idle_time seconds since the scroll, which is taken as the end of the
+    feed. While requests are still loading it waits up to max_wait.
+    """
+    start = time.monotonic()
+    delay = first_poll
+    driver.execute_script(NETWORK_ACTIVITY_JS)
+    height = last_height
+
+    while True:
+        remaining = max_wait - (time.monotonic() - start)
+        if remaining <= 0:
+            break
+        if cancel_event and cancel_event.wait(min(delay, remaining)):
+            raise JobCancelled()
+        elif not cancel_event:
+            time.sleep(min(delay, remaining))
+
+        height = driver.execute_script(SCROLL_HEIGHT_JS)
+        if height != last_height:
+            break
+
+        # No growth yet: only give up once the page has stopped loading anything
+        pending, idle_for = driver.execute_script(NETWORK_ACTIVITY_JS)
+        if not pending and min(idle_for, time.monotonic() - start) >= idle_time:
+            break
+        delay = min(delay * 2, idle_time)
+
+    return height, time.monotonic() - start
+
+
+class _StopParsing(Exception):
+    pass
+
+
+class NextLinkFinder(HTMLParser):
+    """Find the first <link rel="next"> or <a rel="next"> href without parsing the whole page"""
+
+    def __init__(self):
+        super().__init__()
+        self.href = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag not in ('link', 'a'):
+            return
+        attrs = dict(attrs)
+        if 'next' in (attrs.get('rel') or '').lower().split() and attrs.get('href'):
+            self.href = attrs['href']
+            raise _StopParsing()
+
+    def find(self, html):
+        try:
+            self.feed(html)
+        except _StopParsing:
+            pass
+        return self.href
+
+
+class Paginator:
+    """Work out the URLs of successive pages for multi-page scraping
+
+    Strategies:
+      query     append page=N to the query string (the original behaviour)
+      template  substitute N for {page} in the URL
+      next      follow the page's rel="next" link
+      selector  follow the href of the first element matching a CSS selector
+
+    URLs of the first two are known in advance and can be prefetched several
+    pages ahead; the link-following ones can only look one page ahead.
+    """
+
+    STRATEGIES = ('query', 'template', 'next', 'selector')
+
+    def __init__(self, url, strategy='query', next_selector=None):
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown pagination strategy: {strategy}")
+        if strategy == 'template' and '{page}' not in url:
+            raise ValueError("Template pagination needs a {page} placeholder in the URL")
+        if strategy == 'selector' and not next_selector:
+            raise ValueError("Selector pagination needs a CSS selector for the next link")
+        self.url = url
+        self.strategy = strategy
+        self.next_selector = next_selector
+
+    @property
+    def predictable(self):
+        return self.strategy in ('query', 'template')
+
+    def first_url(self):
+        return self.url_for(1) if self.predictable else self.url
+
+    def url_for(self, page):
+        """Return the URL of a page for the query and template strategies"""
+        if self.strategy == 'template':
+            return self.url.replace('{page}', str(page))
+
+        base_url = self.url.split('?')[0] if '?' in self.url else self.url
+        query = self.url.split('?')[1] if '?' in self.url else ""
+        
+        # Construct page URL (this may need adjustment for different websites)
+        if query:
+            return f"{base_url}?{query}&page={page}"
+        return f"{base_url}?page={page}"
+
+    def find_next(self, html, page_url):
+        """Return the absolute URL of the page after this one, or None"""
+        if self.strategy == 'next':
+            href = NextLinkFinder().find(html)
+        else:
+            from bs4 import BeautifulSoup
+
+            tag = BeautifulSoup(html, 'html.parser').select_one(self.next_selector)
+            href = tag.get('href') if tag else None
+        return urljoin(page_url, href) if href else None
+
+
+# Query parameters that only track where a visitor came from, dropped when normalizing links
+TRACKING_PARAMS = frozenset(['fbclid', 'gclid', 'dclid', 'msclkid', 'mc_cid', 'mc_eid', '_ga'])
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# Links to files that are never HTML pages, skipped by the crawler without a request
+NON_HTML_EXTENSIONS = (
+    '.png', '.jpg', '.jpeg', '.gif', '.webp', '.avif', '.svg', '.ico', '.bmp', '.tif', '.tiff',
+    '.pdf', '.zip', '.gz', '.tgz', '.rar', '.7z', '.exe', '.dmg', '.msi', '.apk', '.iso',
+    '.css', '.js', '.json', '.xml', '.rss', '.txt', '.csv', '.xls', '.xlsx', '.doc', '.docx', '.ppt', '.pptx',
+    '.mp3', '.mp4', '.m4a', '.wav', '.ogg', '.webm', '.avi', '.mov', '.woff', '.woff2', '.ttf', '.eot',
+)
+
+# Crawls allowed more pages than this remember seen URLs in a Bloom filter,
+# sized for LINKS_PER_PAGE_ESTIMATE distinct links per page
+BLOOM_FILTER_PAGES = 100_000
+LINKS_PER_PAGE_ESTIMATE = 50
+
+# Product token matched against User-agent lines in robots.txt
+ROBOTS_USER_AGENT = "AdvancedWebScraper"
+
+
+def normalize_url(url, base=None):
+    """Resolve a link against its page and return its canonical form, or None if it cannot be crawled
+
+    The fragment, user info, default port and tracking parameters are dropped,
+    the scheme and host are lowercased and the remaining query parameters are
+    sorted, so links that only differ in those ways are fetched once.
+    """
+    try:
+        parts = urlsplit(urljoin(base, url.strip()) if base else url.strip())
+        port = parts.port
+    except ValueError:
+        return None
+    scheme = parts.scheme.lower()
+    host = parts.hostname
+    if scheme not in DEFAULT_PORTS or not host:
+        return None
+
+    netloc = f"[{host}]" if ':' in host else host
+    if port is not None and port != DEFAULT_PORTS[scheme]:
+        netloc += f":{port}"
+    params = []
+    for param in parts.query.split('&'):
+        name = param.split('=', 1)[0].lower()
+        if param and not name.startswith('utm_') and name not in TRACKING_PARAMS:
+            params.append(param)
+    query = '&'.join(sorted(params))
+    return urlunsplit((scheme, netloc, parts.path or '/', query, ''))
+
+
+def site_host(url):
+    """Return the host a crawl is confined to, without any leading www."""
+    host = urlsplit(url).hostname or ''
+    return host[4:] if host.startswith('www.') else host
+
+
+class LinkCollector(HTMLParser):
+    """Collect the href of every <a> and <area> on a page, honouring <base href>"""
+
+    def __init__(self):
+        super().__init__()
+        self.base = None
+        self.links = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ('a', 'area'):
+            href = dict(attrs).get('href')
+            if href and not href.startswith(('#', 'javascript:', 'mailto:', 'tel:')):
+                self.links.append(href)
+        elif tag == 'base' and self.base is None:
+            self.base = dict(attrs).get('href')
+
+    def collect(self, html, page_url):
+        """Return the page's links, resolved against its base URL"""
+        self.feed(html)
+        self.close()
+        base = urljoin(page_url, self.base) if self.base else page_url
+        return [urljoin(base, href) for href in self.links]
+
+
+class SeenSet:
+    """Exact set of visited URLs, stored as 8-byte digests instead of the full strings"""
+
+    def __init__(self):
+        self._digests = set()
+
+    def add(self, url):
+        """Remember a URL and return True if it had not been seen before"""
+        digest = hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest()
+        if digest in self._digests:
+            return False
+        self._digests.add(digest)
+        return True
+
+    def __len__(self):
+        return len(self._digests)
+
+
+class BloomFilter:
+    """Fixed-size set of visited URLs for very large crawls
+
+    Memory does not grow with the crawl, at the cost of treating roughly one
+    unseen URL in 1/error_rate as already seen once capacity URLs are stored.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self._count = 0
+
+    def add(self, url):
+        """Remember a URL and return True if it had (probably) not been seen before"""
+        digest = hashlib.blake2b(url.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        step = int.from_bytes(digest[8:], 'little') | 1
+        added = False
+        for i in range(self.hashes):
+            bit = (first + i * step) % self.size
+            mask = 1 << (bit & 7)
+            if not self._bits[bit >> 3] & mask:
+                self._bits[bit >> 3] |= mask
+                added = True
+        self._count += added
+        return added
+
+    def __len__(self):
+        return self._count
+
+
+class RobotsRules:
+    """robots.txt rules per site, fetched once each with the scraper's HTTP session
+
+    A missing robots.txt allows everything; one that answers 401, 403 or a
+    server error disallows the whole site, as crawlers conventionally do.
+    """
+
+    def __init__(self, session, timeout=10, user_agent=ROBOTS_USER_AGENT):
+        self.session = session
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self._parsers = {}
+
+    def parser_for(self, url):
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        parser = self._parsers.get(origin)
+        if parser is None:
+            from urllib.robotparser import RobotFileParser
+            import requests
+
+            parser = RobotFileParser(origin + "/robots.txt")
+            try:
+                response = self.session.get(parser.url, timeout=self.timeout)
+            except requests.RequestException:
+                parser.allow_all = True
+            else:
+                if response.status_code in (401, 403) or response.status_code >= 500:
+                    parser.disallow_all = True
+                elif response.status_code >= 400:
+                    parser.allow_all = True
+                else:
+                    parser.parse(response.text.splitlines())
+            self._parsers[origin] = parser
+        return parser
+
+    def allowed(self, url):
+        return self.parser_for(url).can_fetch(self.user_agent, url)
+
+    def crawl_delay(self, url):
+        """Return the Crawl-delay robots.txt asks for on this URL's site, or 0"""
+        return float(self.parser_for(url).crawl_delay(self.user_agent) or 0)
+
+
+class CrawlFrontier:
+    """Breadth-first queue of same-site URLs with per-host concurrency and request spacing
+
+    Each host has its own queue. pop_ready() hands out the shallowest URL whose
+    host has fewer than per_host fetches running and whose last fetch started
+    at least delay seconds ago (or the robots.txt Crawl-delay, if longer).
+    Every normalized URL is queued at most once.
+    """
+
+    def __init__(self, start_url, max_depth, per_host=2, delay=0.5, robots=None, seen=None):
+        self.site = site_host(start_url)
+        self.max_depth = max_depth
+        self.per_host = per_host
+        self.delay = delay
+        self.robots = robots
+        self.seen = seen if seen is not None else SeenSet()
+        self.queues = {}
+        self.active = {}
+        self.next_start = {}
+        self.pending = 0
+        self.duplicates = 0
+        self.blocked = 0
+
+    def same_site(self, url):
+        host = urlsplit(url).hostname or ''
+        return host == self.site or host.endswith('.' + self.site)
+
+    def add(self, url, depth):
+        """Queue a URL found at the given depth and return True if it was new"""
+        if depth > self.max_depth:
+            return False
+        url = normalize_url(url)
+        if not url or not self.same_site(url) or urlsplit(url).path.lower().endswith(NON_HTML_EXTENSIONS):
+            return False
+        if not self.seen.add(url):
+            self.duplicates += 1
+            return False
+        if self.robots and not self.robots.allowed(url):
+            self.blocked += 1
+            return False
+        self.queues.setdefault(urlsplit(url).netloc, deque()).append((url, depth))
+        self.pending += 1
+        return True
+
+    def pop_ready(self):
+        """Return ((url, depth, host), 0) for the next fetch allowed now
+
+        When nothing can start, returns (None, seconds until a delayed host may
+        fetch again), or (None, None) if only running fetches can free a slot.
+        """
+        now = time.monotonic()
+        best = None
+        retry_in = None
+        for host, urls in self.queues.items():
+            if not urls or self.active.get(host, 0) >= self.per_host:
+                continue
+            ready_at = self.next_start.get(host, 0)
+            if ready_at > now:
+                retry_in = ready_at - now if retry_in is None else min(retry_in, ready_at - now)
+            elif best is None or urls[0][1] < self.queues[best][0][1]:
+                best = host
+        if best is None:
+            return None, retry_in
+
+        url, depth = self.queues[best].popleft()
+        self.pending -= 1
+        self.active[best] = self.active.get(best, 0) + 1
+        delay = max(self.delay, self.robots.crawl_delay(url)) if self.robots else self.delay
+        self.next_start[best] = now + delay
+        return (url, depth, best), 0
+
+    def release(self, host):
+        """Free the slot of a finished fetch"""
+        self.active[host] -= 1
+
+    def __len__(self):
+        return self.pending
+
+
+# Settings a scrape job starts from; the GUI form and the command line override them
+DEFAULT_JOB = {
+    'type': "single",
+    'engine': "browser",
+    'load_profile': DEFAULT_LOAD_PROFILE,
+    'extractor': None,
+    'pages': 3,
+    'workers': 4,
+    'pagination': "query",
+    'next_selector': None,
+    'stop_when_stale': False,
+    'max_depth': 2,
+    'concurrency': 8,
+    'per_host': 2,
+    'crawl_delay': 0.5,
+    'robots': True,
+    'scrolls': 5,
+    'wait_time': 2.0,
+    'incremental': True,
+    'adaptive_wait': True,
+    'use_cache': True,
+    'cache_ttl': 3600,
+    'profile': False,
+}
+
+
+def make_job(url, **settings):
+    """Build a job dict for a URL from DEFAULT_JOB and any overridden settings"""
+    job = dict(DEFAULT_JOB, url=url)
+    job.update(settings)
+    return job
+
+
+class ScrapeEngine:
+    """Fetching and extraction logic shared by the Tk window and the command line
+
+    Progress goes to on_status(text) and every extracted page or scroll batch to
+    on_output(content, label, url). Browsers, the HTTP client and the page cache
+    can be passed in to share them between engines; otherwise the engine creates
+    them on first use and closes them in close(). Phase durations go to timings,
+    and with the job's profile setting the last run's cProfile data is kept in
+    profilers: the job's own thread first, then every fetch run on a pool or
+    crawl thread.
+    """
+
+    def __init__(self, on_status=None, on_output=None, cancel_event=None,
+                 driver_pool=None, static_fetcher=None, page_cache=None, network_stats=None, timings=None):
+        self.on_status = on_status or (lambda text: None)
+        self.on_output = on_output or (lambda content, label, url: None)
+        self.cancel_event = cancel_event or threading.Event()
+        self.driver = None
+        self.driver_pool = driver_pool
+        self.static_fetcher = static_fetcher
+        self.page_cache = page_cache
+        self.owns_resources = not (driver_pool or static_fetcher or page_cache)
+        self.network = network_stats or (driver_pool.network if driver_pool else NetworkStats())
+        self.timings = timings or (driver_pool.timings if driver_pool else PhaseTimings())
+        self.profilers = []
+        self.load_profile = driver_pool.profile if driver_pool else DEFAULT_LOAD_PROFILE
+        self.network_log = (driver_pool.network_log if driver_pool
+                            else LOAD_PROFILES[DEFAULT_LOAD_PROFILE]['network_log'])
+        self.extractor = None
+        self.failed_pages = 0
+        self.scroll_waits = []
+        self.pagination_stop = None
+        self.crawl_summary = None
+    
+    def initialize_driver(self):
+        """Initialize Chrome WebDriver"""
+        if self.driver:
+            self.driver.quit()
+            self.driver = None
+            
+        try:
+            self.driver = launch_chrome(self.load_profile, self.timings, self.network_log)
+        except Exception as e:
+            raise RuntimeError(f"Failed to initialize browser: {str(e)}") from e
+    
+    def get_driver_pool(self, size=None):
+        """Return the driver pool, rebuilding an owned pool for a different size, load profile or logging"""
+        if self.driver_pool and self.owns_resources and (
+                (size and self.driver_pool.size != size) or self.driver_pool.profile != self.load_profile
+                or self.driver_pool.network_log != self.network_log):
+            self.driver_pool.close()
+            self.driver_pool = None
+        if not self.driver_pool:
+            self.driver_pool = DriverPool(size or 1, profile=self.load_profile, network=self.network,
+                                          timings=self.timings, network_log=self.network_log)
+        return self.driver_pool
+    
+    def get_static_fetcher(self, engine):
+        """Return the shared HTTP client when the static engine is selected"""
+        if engine != "static":
+            return None
+        if not self.static_fetcher:
+            self.static_fetcher = StaticFetcher(timings=self.timings)
+        return self.static_fetcher
+    
+    def get_page_cache(self, job):
+        """Return the page cache with this job's TTL, or None if caching is off"""
+        if not job['use_cache']:
+            return None
+        if not self.page_cache:
+            self.page_cache = PageCache()
+        self.page_cache.ttl = job['cache_ttl']
+        return self.page_cache
+    
+    def run(self, job):
+        """Run a scrape job and return a one-line summary
+
+        Raises JobCancelled if cancel_event is set while the job is running.
+        """
+        self.failed_pages = 0
+        self.scroll_waits = []
+        self.pagination_stop = None
+        self.crawl_summary = None
+        self.extractor = job['extractor']
+        if self.owns_resources:
+            # A shared pool keeps the profile it was created with; network stats are
+            # logged for the trimmed profiles, and for any profile when profiling
+            self.load_profile = job['load_profile']
+            self.network_log = job['profile'] or LOAD_PROFILES[self.load_profile]['network_log']
+            self.network.reset()
+            self.timings.reset()
+        self.profilers = []
+        profiler = None
+        if job['profile']:
+            import cProfile
+
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+                self.profilers.append(profiler)
+            except ValueError:
+                # Python 3.12+ allows one active profiler per process
+                profiler = None
+        try:
+            # Single, multi-page and crawl runs use the driver pool, and with the static engine
+            # only start a browser if a page turns out to need one
+            if job['type'] == "scroll":
+                self.initialize_driver()
+                
+            cache = self.get_page_cache(job)
+            if cache and self.owns_resources:
+                cache.reset_stats()
+                
+            if job['type'] == "single":
+                self.scrape_single_page(job['url'], job['engine'], cache)
+            elif job['type'] == "multi":
+                self.scrape_multiple_pages(job['url'], job['pages'], job['workers'], job['engine'], cache,
+                                           job['pagination'], job['next_selector'], job['stop_when_stale'])
+            elif job['type'] == "crawl":
+                self.scrape_crawl(job['url'], job['pages'], job['max_depth'], job['concurrency'], job['per_host'],
+                                  job['crawl_delay'], job['robots'], job['engine'], cache, job['workers'])
+            elif job['type'] == "scroll":
+                self.scrape_infinite_scroll(job['url'], job['scrolls'], job['wait_time'],
+                                            job['incremental'], job['adaptive_wait'])
+            else:
+                raise ValueError(f"Unknown scraping type: {job['type']}")
+        finally:
+            if profiler:
+                profiler.disable()
+            if self.driver:
+                self.driver.quit()
+                self.driver = None
+                
+        if self.failed_pages:
+            summary = f"Scraping completed with {self.failed_pages} failed page(s)"
+        else:
+            summary = "Scraping completed successfully"
+        if self.pagination_stop:
+            summary += f" - stopped early: {self.pagination_stop}"
+        if self.crawl_summary:
+            summary += f" - {self.crawl_summary}"
+        if self.scroll_waits:
+            waited = sum(self.scroll_waits)
+            fixed = job['wait_time'] * len(self.scroll_waits)
+            summary += f" - waited {waited:.1f}s over {len(self.scroll_waits)} scrolls (fixed wait: {fixed:.1f}s)"
+        if cache and job['type'] != "scroll":
+            summary += f" - {cache.stats()}"
+        if self.owns_resources and self.network.pages:
+            summary += f" - {self.load_profile} {self.network}"
+        return summary
+    
+    def check_cancelled(self):
+        """Stop the job if cancellation was requested"""
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+    
+    def scrape_single_page(self, url, engine="browser", cache=None):
+        """Scrape content from a single page"""
+        self.on_status(f"Loading page: {url}")
+        
+        page = load_page(url, self.fetch_with_pool, self.get_static_fetcher(engine), cache)
+        self.check_cancelled()
+        
+        self.process_fetched_page(page, cache=cache)
+    
+    def fetch_with_pool(self, url):
+        """Load a page on a pooled browser, starting one on first use"""
+        self.check_cancelled()
+        return self.get_driver_pool().fetch_html(url, self.cancel_event)
+    
+    def scrape_multiple_pages(self, url, pages, workers, engine="browser", cache=None,
+                              pagination="query", next_selector=None, stop_when_stale=False):
+        """Scrape content from multiple pages with pagination
+
+        Pages are fetched ahead of the one being parsed: up to one pool's worth
+        for predictable page URLs, one page for link-following pagination.
+        Scraping stops early when a page repeats an earlier page's content or
+        has no next link. With stop_when_stale it also stops at a page whose
+        extracted lines (headings, paragraphs and links) all appeared on earlier
+        pages; lines already seen are remembered as 8-byte digests.
+        """
+        paginator = Paginator(url, pagination, next_selector)
+        pool = self.get_driver_pool(min(workers, pages))
+        static_fetcher = self.get_static_fetcher(engine)
+        lookahead = pool.size if paginator.predictable else 1
+        
+        inflight = {1: (paginator.first_url(), pool.submit(paginator.first_url(), static_fetcher, cache, self.profilers))}
+        visited = {paginator.first_url()}
+        content_hashes = {}
+        seen_items = SeenSet()
+        
+        try:
+            for page in range(1, pages + 1):
+                # Keep the prefetch window full when page URLs are known in advance
+                if paginator.predictable:
+                    for ahead in range(page, min(pages, page + lookahead - 1) + 1):
+                        if ahead not in inflight:
+                            ahead_url = paginator.url_for(ahead)
+                            inflight[ahead] = (ahead_url, pool.submit(ahead_url, static_fetcher, cache, self.profilers))
+                
+                if page not in inflight:
+                    self.pagination_stop = f"no next page after page {page - 1}"
+                    break
+                page_url, future = inflight.pop(page)
+                
+                while not future.done():
+                    self.check_cancelled()
+                    status = f"Scraping page {page} of up to {pages}..."
+                    self.on_status(f"{status} {cache.stats()}" if cache else status)
+                    wait([future], timeout=POLL_INTERVAL_MS / 1000)
+                    
+                try:
+                    fetched = future.result()
+                except Exception as e:
+                    # A failed page is reported in place and does not stop the remaining pages,
+                    # unless the next page's URL had to come from it
+                    self.failed_pages += 1
+                    self.on_output(f"[Failed to load {page_url}: {e}]", f"PAGE {page}", page_url)
+                    continue
+                
+                # Start loading the linked next page before parsing this one
+                if not paginator.predictable and page < pages:
+                    next_url = paginator.find_next(fetched.html, page_url)
+                    if next_url and next_url not in visited:
+                        visited.add(next_url)
+                        inflight[page + 1] = (next_url, pool.submit(next_url, static_fetcher, cache, self.profilers))
+                
+                output = self.page_output(fetched, cache)
+                
+                # Stop at the first page that repeats earlier content or adds nothing new
+                digest = hashlib.sha1(output.encode('utf-8')).hexdigest()
+                if digest in content_hashes:
+                    self.pagination_stop = f"page {page} repeats page {content_hashes[digest]}"
+                    break
+                content_hashes[digest] = page
+                if stop_when_stale:
+                    new_lines = [line for line in output.split("\n") if line.strip() and seen_items.add(line)]
+                    if page > 1 and not new_lines:
+                        self.pagination_stop = f"page {page} has no new items"
+                        break
+                
+                self.on_output(output, f"PAGE {page}", fetched.url)
+        finally:
+            # Drop prefetched pages if the job stopped early
+            for _, future in inflight.values():
+                future.cancel()
+    
+    def scrape_crawl(self, url, pages, max_depth, concurrency, per_host, delay, robots=True,
+                     engine="browser", cache=None, workers=4):
+        """Crawl same-site links breadth-first from url
+
+        Up to concurrency pages load at once, no more than per_host of them from
+        one host, and fetches from a host start at least delay seconds apart.
+        Links are followed up to max_depth clicks from the start page and the
+        crawl stops after pages fetches.
+        """
+        static_fetcher = self.get_static_fetcher(engine)
+        self.get_driver_pool(min(workers, concurrency))
+        rules = RobotsRules((static_fetcher or StaticFetcher()).session) if robots else None
+        seen = BloomFilter(pages * LINKS_PER_PAGE_ESTIMATE) if pages > BLOOM_FILTER_PAGES else SeenSet()
+        frontier = CrawlFrontier(url, max_depth, per_host, delay, rules, seen)
+        if not frontier.add(url, 0):
+            raise ValueError(f"Cannot crawl {url}: not an http(s) page or disallowed by robots.txt")
+        
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="crawl")
+        inflight = {}
+        started = 0
+        crawled = 0
+        try:
+            while inflight or (frontier and started < pages):
+                self.check_cancelled()
+                
+                # Start every fetch the frontier's per-host limits allow
+                retry_in = None
+                while len(inflight) < concurrency and started < pages:
+                    item, retry_in = frontier.pop_ready()
+                    if item is None:
+                        break
+                    started += 1
+                    task = (load_page, item[0], self.fetch_with_pool, static_fetcher, cache)
+                    if self.profilers:
+                        task = (call_profiled, self.profilers) + task
+                    inflight[executor.submit(*task)] = item
+                
+                timeout = POLL_INTERVAL_MS / 1000
+                if retry_in is not None:
+                    timeout = min(timeout, retry_in)
+                if not inflight:
+                    # Every queued host is waiting out its politeness delay
+                    if self.cancel_event.wait(timeout):
+                        raise JobCancelled()
+                    continue
+                done, _ = wait(inflight, timeout=timeout, return_when=FIRST_COMPLETED)
+                
+                for future in done:
+                    page_url, depth, host = inflight.pop(future)
+                    frontier.release(host)
+                    try:
+                        fetched = future.result()
+                    except JobCancelled:
+                        raise
+                    except Exception as e:
+                        self.failed_pages += 1
+                        self.on_output(f"[Failed to load {page_url}: {e}]", f"FAILED (depth {depth})", page_url)
+                        continue
+                    
+                    crawled += 1
+                    if depth < max_depth:
+                        for link in LinkCollector().collect(fetched.html, page_url):
+                            frontier.add(link, depth + 1)
+                    self.on_output(self.page_output(fetched, cache), f"PAGE {crawled} (depth {depth})", page_url)
+                
+                status = f"Crawled {crawled} of up to {pages} pages, {len(inflight)} loading, {len(frontier)} queued"
+                self.on_status(f"{status} {cache.stats()}" if cache else status)
+        finally:
+            # Wait for fetches already running so none outlives the job; pool waits end on cancel
+            executor.shutdown(wait=True, cancel_futures=True)
+            if rules and not static_fetcher:
+                rules.session.close()
+            
+        self.crawl_summary = (f"crawled {crawled} pages, skipped {frontier.duplicates} duplicate links"
+                              f" and {frontier.blocked} blocked by robots.txt, {len(frontier)} left unvisited")
+    
+    def scrape_infinite_scroll(self, url, scrolls, wait_time, incremental=False, adaptive_wait=False):
+        """Scrape content from infinite scroll page
+
+        In incremental mode the initial page is extracted straight away and each
+        scroll only extracts the nodes a MutationObserver saw being added. With
+        adaptive_wait, wait_time is the ceiling for each scroll rather than a fixed
+        pause, and the time actually spent waiting is recorded in scroll_waits.
+        """
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        with self.timings.phase('navigate', url):
+            self.driver.get(url)
+        with self.timings.phase('wait', url):
+            WebDriverWait(self.driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+        
+        if incremental:
+            # The snapshot is taken in the same script that starts observing, so a node the
+            # page adds in between cannot end up in both the snapshot and the first scroll
+            with self.timings.phase('page_source', url) as sample:
+                html = self.driver.execute_script(INSTALL_MUTATION_OBSERVER_JS)
+                sample['bytes'] = len(html)
+            self.on_output(self.extract(html, url), "INITIAL CONTENT", url)
+        
+        if adaptive_wait:
+            # Start counting requests before the first scroll can trigger one
+            self.driver.execute_script(NETWORK_ACTIVITY_JS)
+        last_height = self.driver.execute_script(SCROLL_HEIGHT_JS)
+        if self.network_log:
+            self.network.record(self.driver)
+        
+        for i in range(1, scrolls + 1):
+            self.check_cancelled()
+            self.on_status(f"Scrolling ({i}/{scrolls}), current height: {last_height}px")
+            
+            # Scroll to bottom, waking up early if the job is cancelled
+            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+            if adaptive_wait:
+                with self.timings.phase('scroll_wait', url):
+                    new_height, waited = wait_for_scroll_growth(self.driver, last_height, wait_time, self.cancel_event)
+                self.scroll_waits.append(waited)
+            else:
+                with self.timings.phase('scroll_wait', url):
+                    cancelled = self.cancel_event.wait(wait_time)
+                if cancelled:
+                    raise JobCancelled()
+                
+                # Calculate new scroll height
+                new_height = self.driver.execute_script(SCROLL_HEIGHT_JS)
+            
+            if incremental:
+                self.process_added_content(f"SCROLL {i}", url)
+            # Drain the browser's performance log every scroll so it never builds up
+            if self.network_log:
+                self.network.record(self.driver, new_page=False)
+            
+            if new_height == last_height:
+                self.on_status(f"Stopped scrolling - no new content (iteration {i})")
+                break
+            last_height = new_height
+        
+        if not incremental:
+            self.process_page_content("SCROLLED CONTENT", url=url)
+    
+    def extract(self, html, url=None):
+        with self.timings.phase('extract', url) as sample:
+            sample['bytes'] = len(html)
+            return extract_structured_text(html, backend=self.extractor)
+    
+    def process_added_content(self, label, url=None):
+        """Extract only the content added since the previous scroll"""
+        with self.timings.phase('added_nodes', url) as sample:
+            added_html = self.driver.execute_script(TAKE_ADDED_NODES_JS)
+            sample['bytes'] = len(added_html or '')
+        if not added_html:
+            return
+        structured_text = self.extract(added_html, url)
+        if structured_text:
+            self.on_output(structured_text, label, url)
+
+    def page_output(self, page, cache=None):
+        """Extract a fetched page, reusing its cached output when it is unchanged"""
+        output = page.output
+        if output is None:
+            output = self.extract(page.html, page.url)
+            if cache:
+                cache.put(page, output)
+        return output
+
+    def process_fetched_page(self, page, label="", cache=None):
+        """Extract a fetched page and pass it on"""
+        self.on_output(self.page_output(page, cache), label, page.url)
+
+    def process_page_content(self, label="", url=None):
+        """Extract structured content from the current page"""
+        with self.timings.phase('page_source', url) as sample:
+            html = self.driver.page_source
+            sample['bytes'] = len(html)
+        self.on_output(self.extract(html, url), label, url)
+    
+    def close(self):
+        """Quit browsers and release connections the engine created itself"""
+        if self.driver:
+            self.driver.quit()
+            self.driver = None
+        if not self.owns_resources:
+            return
+        if self.driver_pool:
+            self.driver_pool.close()
+            self.driver_pool = None
+        if self.static_fetcher:
+            self.static_fetcher.close()
+            self.static_fetcher = None
+        if self.page_cache:
+            self.page_cache.close()
+            self.page_cache = None
+
 
 class AdvancedWebScraper:
     def __init__(self, root):
@@ -17,8 +1912,13 @@ class AdvancedWebScraper:
         self.root.title("Advanced Web Scraper")
         self.root.geometry("900x700")
         self.dark_mode = False
-        self.driver = None
-        self.scraped_data = ""
+        self.sink = None
+        self.worker = None
+        self.job = None
+        self.ui_queue = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.engine = ScrapeEngine(on_status=self.set_status, on_output=self.append_output,
+                                   cancel_event=self.cancel_event)
         
         # Configure styles
         self.style = ttk.Style()
@@ -36,6 +1936,9 @@ class AdvancedWebScraper:
         self.main_frame.columnconfigure(1, weight=1)
         self.main_frame.rowconfigure(4, weight=1)
         
+        # Shut down pooled browsers when the window closes
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
     def configure_styles(self):
         """Configure light and dark mode styles"""
         self.style.configure('TFrame', background='white')
@@ -76,14 +1979,30 @@ class AdvancedWebScraper:
                         variable=self.scraping_type, value="multi").grid(row=0, column=1, sticky=W, padx=5)
         ttk.Radiobutton(options_frame, text="Infinite Scroll", 
                         variable=self.scraping_type, value="scroll").grid(row=0, column=2, sticky=W, padx=5)
+        ttk.Radiobutton(options_frame, text="Crawl Site", 
+                        variable=self.scraping_type, value="crawl").grid(row=0, column=3, sticky=W, padx=5)
         
         # Options for multiple pages
         self.pages_frame = ttk.Frame(options_frame)
         self.pages_frame.grid(row=1, column=0, columnspan=3, sticky=W, pady=(10, 0))
-        ttk.Label(self.pages_frame, text="Pages to scrape:").pack(side=LEFT)
+        ttk.Label(self.pages_frame, text="Max pages:").pack(side=LEFT)
         self.pages_entry = ttk.Entry(self.pages_frame, width=5)
         self.pages_entry.pack(side=LEFT, padx=5)
         self.pages_entry.insert(0, "3")
+        ttk.Label(self.pages_frame, text="Parallel browsers:").pack(side=LEFT, padx=(10, 0))
+        self.workers_entry = ttk.Entry(self.pages_frame, width=5)
+        self.workers_entry.pack(side=LEFT, padx=5)
+        self.workers_entry.insert(0, "4")
+        ttk.Label(self.pages_frame, text="Pagination:").pack(side=LEFT, padx=(10, 0))
+        self.pagination_var = StringVar(value="query")
+        ttk.Combobox(self.pages_frame, textvariable=self.pagination_var, values=list(Paginator.STRATEGIES),
+                     state="readonly", width=8).pack(side=LEFT, padx=5)
+        ttk.Label(self.pages_frame, text="Next link selector:").pack(side=LEFT, padx=(10, 0))
+        self.next_selector_entry = ttk.Entry(self.pages_frame, width=15)
+        self.next_selector_entry.pack(side=LEFT, padx=5)
+        self.stop_when_stale_var = BooleanVar(value=False)
+        ttk.Checkbutton(self.pages_frame, text="Stop when a page adds nothing new",
+                        variable=self.stop_when_stale_var).pack(side=LEFT, padx=(10, 0))
         self.pages_frame.grid_remove()
         
         # Options for infinite scroll
@@ -93,12 +2012,83 @@ class AdvancedWebScraper:
         self.scroll_entry = ttk.Entry(self.scroll_frame, width=5)
         self.scroll_entry.pack(side=LEFT, padx=5)
         self.scroll_entry.insert(0, "5")
-        ttk.Label(self.scroll_frame, text="Wait time (sec):").pack(side=LEFT, padx=(10, 0))
+        ttk.Label(self.scroll_frame, text="Max wait (sec):").pack(side=LEFT, padx=(10, 0))
         self.wait_entry = ttk.Entry(self.scroll_frame, width=5)
         self.wait_entry.pack(side=LEFT, padx=5)
         self.wait_entry.insert(0, "2")
+        self.incremental_var = BooleanVar(value=True)
+        ttk.Checkbutton(self.scroll_frame, text="Extract incrementally", 
+                        variable=self.incremental_var).pack(side=LEFT, padx=(10, 0))
+        self.adaptive_wait_var = BooleanVar(value=True)
+        ttk.Checkbutton(self.scroll_frame, text="Adaptive wait", 
+                        variable=self.adaptive_wait_var).pack(side=LEFT, padx=(10, 0))
         self.scroll_frame.grid_remove()
         
+        # Options for crawling a site
+        self.crawl_frame = ttk.Frame(options_frame)
+        self.crawl_frame.grid(row=2, column=0, columnspan=4, sticky=W, pady=(10, 0))
+        ttk.Label(self.crawl_frame, text="Max pages:").pack(side=LEFT)
+        self.crawl_pages_entry = ttk.Entry(self.crawl_frame, width=6)
+        self.crawl_pages_entry.pack(side=LEFT, padx=5)
+        self.crawl_pages_entry.insert(0, "100")
+        ttk.Label(self.crawl_frame, text="Max depth:").pack(side=LEFT, padx=(10, 0))
+        self.depth_entry = ttk.Entry(self.crawl_frame, width=4)
+        self.depth_entry.pack(side=LEFT, padx=5)
+        self.depth_entry.insert(0, str(DEFAULT_JOB['max_depth']))
+        ttk.Label(self.crawl_frame, text="Parallel fetches:").pack(side=LEFT, padx=(10, 0))
+        self.concurrency_entry = ttk.Entry(self.crawl_frame, width=4)
+        self.concurrency_entry.pack(side=LEFT, padx=5)
+        self.concurrency_entry.insert(0, str(DEFAULT_JOB['concurrency']))
+        ttk.Label(self.crawl_frame, text="Per host:").pack(side=LEFT, padx=(10, 0))
+        self.per_host_entry = ttk.Entry(self.crawl_frame, width=4)
+        self.per_host_entry.pack(side=LEFT, padx=5)
+        self.per_host_entry.insert(0, str(DEFAULT_JOB['per_host']))
+        ttk.Label(self.crawl_frame, text="Delay (sec):").pack(side=LEFT, padx=(10, 0))
+        self.crawl_delay_entry = ttk.Entry(self.crawl_frame, width=4)
+        self.crawl_delay_entry.pack(side=LEFT, padx=5)
+        self.crawl_delay_entry.insert(0, str(DEFAULT_JOB['crawl_delay']))
+        self.robots_var = BooleanVar(value=True)
+        ttk.Checkbutton(self.crawl_frame, text="Obey robots.txt", 
+                        variable=self.robots_var).pack(side=LEFT, padx=(10, 0))
+        self.crawl_frame.grid_remove()
+        
+        # Fetch engine selection (infinite scroll always needs the browser)
+        engine_frame = ttk.Frame(options_frame)
+        engine_frame.grid(row=3, column=0, columnspan=3, sticky=W, pady=(10, 0))
+        ttk.Label(engine_frame, text="Fetch engine:").pack(side=LEFT)
+        self.fetch_engine = StringVar(value="browser")
+        ttk.Radiobutton(engine_frame, text="Browser", 
+                        variable=self.fetch_engine, value="browser").pack(side=LEFT, padx=5)
+        ttk.Radiobutton(engine_frame, text="Static HTTP (browser fallback)", 
+                        variable=self.fetch_engine, value="static").pack(side=LEFT, padx=5)
+        
+        # What the browser downloads per page
+        ttk.Label(engine_frame, text="Page load:").pack(side=LEFT, padx=(15, 0))
+        self.load_profile_var = StringVar(value=DEFAULT_LOAD_PROFILE)
+        ttk.Combobox(engine_frame, textvariable=self.load_profile_var, values=list(LOAD_PROFILES),
+                     state="readonly", width=8).pack(side=LEFT, padx=5)
+        
+        # Output format written by the streaming sink
+        format_frame = ttk.Frame(options_frame)
+        format_frame.grid(row=4, column=0, columnspan=3, sticky=W, pady=(10, 0))
+        ttk.Label(format_frame, text="Output format:").pack(side=LEFT)
+        self.output_format = StringVar(value="txt")
+        ttk.Combobox(format_frame, textvariable=self.output_format, values=list(OutputSink.FORMATS),
+                     state="readonly", width=6).pack(side=LEFT, padx=5)
+        
+        # Page cache for single and multi-page runs
+        self.use_cache_var = BooleanVar(value=True)
+        ttk.Checkbutton(format_frame, text="Cache pages for (min):", 
+                        variable=self.use_cache_var).pack(side=LEFT, padx=(15, 0))
+        self.cache_ttl_entry = ttk.Entry(format_frame, width=5)
+        self.cache_ttl_entry.pack(side=LEFT, padx=5)
+        self.cache_ttl_entry.insert(0, "60")
+        
+        # cProfile data for the timing report
+        self.profile_var = BooleanVar(value=False)
+        ttk.Checkbutton(format_frame, text="Profile with cProfile", 
+                        variable=self.profile_var).pack(side=LEFT, padx=(15, 0))
+        
         # Bind radio button changes
         self.scraping_type.trace('w', self.update_options_visibility)
         
@@ -123,10 +2113,19 @@ class AdvancedWebScraper:
         self.scrape_btn = ttk.Button(button_frame, text="Start Scraping", command=self.start_scraping)
         self.scrape_btn.pack(side=LEFT, padx=5)
         
+        # Cancel button
+        self.cancel_btn = ttk.Button(button_frame, text="Cancel", state=DISABLED, command=self.cancel_scraping)
+        self.cancel_btn.pack(side=LEFT, padx=5)
+        
         # Save button
         self.save_btn = ttk.Button(button_frame, text="Save Results", state=DISABLED, command=self.save_results)
         self.save_btn.pack(side=LEFT, padx=5)
         
+        # Timing report button
+        self.timings_btn = ttk.Button(button_frame, text="Save Timing Report", state=DISABLED,
+                                      command=self.save_timing_report)
+        self.timings_btn.pack(side=LEFT, padx=5)
+        
         # Dark mode toggle
         self.dark_mode_btn = ttk.Button(button_frame, text="Toggle Dark Mode", command=self.toggle_dark_mode)
         self.dark_mode_btn.pack(side=RIGHT, padx=5)
@@ -141,11 +2140,14 @@ class AdvancedWebScraper:
         """Show/hide options based on selected scraping type"""
         self.pages_frame.grid_remove()
         self.scroll_frame.grid_remove()
+        self.crawl_frame.grid_remove()
         
         if self.scraping_type.get() == "multi":
             self.pages_frame.grid()
         elif self.scraping_type.get() == "scroll":
             self.scroll_frame.grid()
+        elif self.scraping_type.get() == "crawl":
+            self.crawl_frame.grid()
     
     def toggle_dark_mode(self):
         """Toggle between dark and light themes"""
@@ -180,188 +2182,489 @@ class AdvancedWebScraper:
                 if isinstance(widget, (ttk.Label, ttk.Button, ttk.Radiobutton)):
                     widget.configure(style='TLabel' if isinstance(widget, ttk.Label) else 'TButton')
     
-    def initialize_driver(self):
-        """Initialize Chrome WebDriver"""
-        if self.driver:
-            self.driver.quit()
+    def read_job_settings(self):
+        """Validate the form and return the job settings, or None if invalid"""
+        url = self.url_entry.get().strip()
+        if not url:
+            messagebox.showerror("Error", "Please enter a valid URL")
+            return None
             
-        chrome_options = Options()
-        chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--no-sandbox")
+        job = make_job(
+            url,
+            type=self.scraping_type.get(),
+            engine=self.fetch_engine.get(),
+            load_profile=self.load_profile_var.get(),
+            format=self.output_format.get(),
+            use_cache=self.use_cache_var.get(),
+            profile=self.profile_var.get(),
+        )
         
-        try:
-            self.driver = webdriver.Chrome(
-                service=Service(ChromeDriverManager().install()),
-                options=chrome_options
-            )
-            return True
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to initialize browser: {str(e)}")
-            return False
+        if job['use_cache']:
+            try:
+                job['cache_ttl'] = float(self.cache_ttl_entry.get()) * 60
+                if job['cache_ttl'] < 0:
+                    raise ValueError
+            except ValueError:
+                messagebox.showerror("Error", "Please enter a valid cache lifetime in minutes (≥0)")
+                return None
+        
+        if job['type'] == "multi":
+            try:
+                job['pages'] = int(self.pages_entry.get())
+                if job['pages'] < 1:
+                    raise ValueError
+            except ValueError:
+                messagebox.showerror("Error", "Please enter a valid number of pages (≥1)")
+                return None
+            try:
+                job['workers'] = int(self.workers_entry.get())
+                if job['workers'] < 1:
+                    raise ValueError
+            except ValueError:
+                messagebox.showerror("Error", "Please enter a valid number of parallel browsers (≥1)")
+                return None
+            job['pagination'] = self.pagination_var.get()
+            job['next_selector'] = self.next_selector_entry.get().strip() or None
+            job['stop_when_stale'] = self.stop_when_stale_var.get()
+            try:
+                Paginator(url, job['pagination'], job['next_selector'])
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
+                return None
+        elif job['type'] == "scroll":
+            try:
+                job['scrolls'] = int(self.scroll_entry.get())
+                job['wait_time'] = float(self.wait_entry.get())
+                job['incremental'] = self.incremental_var.get()
+                job['adaptive_wait'] = self.adaptive_wait_var.get()
+                if job['scrolls'] < 1 or job['wait_time'] < 0.5:
+                    raise ValueError
+            except ValueError:
+                messagebox.showerror("Error", "Please enter valid scroll settings (iterations ≥1, wait ≥0.5)")
+                return None
+        elif job['type'] == "crawl":
+            try:
+                job['pages'] = int(self.crawl_pages_entry.get())
+                job['max_depth'] = int(self.depth_entry.get())
+                job['concurrency'] = int(self.concurrency_entry.get())
+                job['per_host'] = int(self.per_host_entry.get())
+                job['crawl_delay'] = float(self.crawl_delay_entry.get())
+                job['robots'] = self.robots_var.get()
+                if (job['pages'] < 1 or job['max_depth'] < 0 or job['concurrency'] < 1
+                        or job['per_host'] < 1 or job['crawl_delay'] < 0):
+                    raise ValueError
+            except ValueError:
+                messagebox.showerror("Error", "Please enter valid crawl settings "
+                                     "(pages ≥1, depth ≥0, parallel fetches ≥1, per host ≥1, delay ≥0)")
+                return None
+            if not normalize_url(url):
+                messagebox.showerror("Error", "Crawling needs an http:// or https:// URL")
+                return None
+                
+        return job
     
     def start_scraping(self):
         """Start the scraping process based on user selection"""
-        url = self.url_entry.get().strip()
-        if not url:
-            messagebox.showerror("Error", "Please enter a valid URL")
+        job = self.read_job_settings()
+        if not job:
             return
             
-        if not self.initialize_driver():
-            return
-            
-        self.scraped_data = ""
+        # Each job streams into a fresh spool file
+        if self.sink:
+            self.sink.close()
+        self.sink = OutputSink(job['format'])
         self.output_text.delete(1.0, END)
         self.save_btn.config(state=DISABLED)
+        self.timings_btn.config(state=DISABLED)
+        self.scrape_btn.config(state=DISABLED)
+        self.cancel_btn.config(state=NORMAL)
         self.status_var.set("Initializing scraping...")
-        self.root.update()
         
-        try:
-            scrape_type = self.scraping_type.get()
-            
-            if scrape_type == "single":
-                self.scrape_single_page(url)
-            elif scrape_type == "multi":
-                self.scrape_multiple_pages(url)
-            elif scrape_type == "scroll":
-                self.scrape_infinite_scroll(url)
-                
-            self.status_var.set("Scraping completed successfully")
-            self.save_btn.config(state=NORMAL)
-        except Exception as e:
-            messagebox.showerror("Error", f"Scraping failed: {str(e)}")
-            self.status_var.set("Scraping failed")
-        finally:
-            if self.driver:
-                self.driver.quit()
-                self.driver = None
+        # The job runs on a worker thread and reports back through ui_queue
+        self.job = job
+        self.cancel_event.clear()
+        self.worker = threading.Thread(target=self.run_job, args=(job,), daemon=True)
+        self.worker.start()
+        self.root.after(POLL_INTERVAL_MS, self.poll_queue)
     
-    def scrape_single_page(self, url):
-        """Scrape content from a single page"""
-        self.status_var.set(f"Loading page: {url}")
-        self.root.update()
-        
-        self.driver.get(url)
-        WebDriverWait(self.driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-        
-        self.process_page_content()
+    def cancel_scraping(self):
+        """Ask the running job to stop at its next checkpoint"""
+        self.cancel_event.set()
+        self.cancel_btn.config(state=DISABLED)
+        self.status_var.set("Cancelling...")
     
-    def scrape_multiple_pages(self, url):
-        """Scrape content from multiple pages with pagination"""
+    def run_job(self, job):
+        """Run a scrape job on the worker thread"""
         try:
-            pages = int(self.pages_entry.get())
-            if pages < 1:
-                raise ValueError
-        except ValueError:
-            messagebox.showerror("Error", "Please enter a valid number of pages (≥1)")
-            return
-            
-        base_url = url.split('?')[0] if '?' in url else url
-        query = url.split('?')[1] if '?' in url else ""
-        
-        for page in range(1, pages + 1):
-            self.status_var.set(f"Scraping page {page} of {pages}...")
-            self.root.update()
-            
-            # Construct page URL (this may need adjustment for different websites)
-            if query:
-                page_url = f"{base_url}?{query}&page={page}"
-            else:
-                page_url = f"{base_url}?page={page}"
-                
-            self.driver.get(page_url)
-            WebDriverWait(self.driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-            
-            self.process_page_content(f"\n=== PAGE {page} ===\n")
-            
-            # Check if there's a next page (optional enhancement)
-            # Could add logic to detect when we've reached the last page
+            self.ui_queue.put(('done', self.engine.run(job)))
+        except JobCancelled:
+            self.ui_queue.put(('done', "Scraping cancelled"))
+        except Exception as e:
+            self.ui_queue.put(('error', f"Scraping failed: {str(e)}"))
     
-    def scrape_infinite_scroll(self, url):
-        """Scrape content from infinite scroll page"""
+    def poll_queue(self):
+        """Apply queued progress messages from the worker to the widgets"""
+        chunks = []
+        finished = False
         try:
-            scrolls = int(self.scroll_entry.get())
-            wait_time = float(self.wait_entry.get())
-            if scrolls < 1 or wait_time < 0.5:
-                raise ValueError
-        except ValueError:
-            messagebox.showerror("Error", "Please enter valid scroll settings (iterations ≥1, wait ≥0.5)")
-            return
+            while True:
+                kind, payload = self.ui_queue.get_nowait()
+                if kind == 'status':
+                    self.status_var.set(payload)
+                elif kind == 'output':
+                    chunks.append(payload)
+                else:
+                    finished = True
+                    self.status_var.set(payload if kind == 'done' else "Scraping failed")
+                    if kind == 'error':
+                        self.root.after_idle(messagebox.showerror, "Error", payload)
+        except queue.Empty:
+            pass
             
-        self.driver.get(url)
-        WebDriverWait(self.driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-        
-        last_height = self.driver.execute_script("return document.body.scrollHeight")
-        
-        for i in range(1, scrolls + 1):
-            self.status_var.set(f"Scrolling ({i}/{scrolls}), current height: {last_height}px")
-            self.root.update()
+        # Insert everything received since the last poll in one go
+        if chunks:
+            self.show_output(''.join(chunks))
             
-            # Scroll to bottom
-            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(wait_time)
+        if finished:
+            self.scrape_btn.config(state=NORMAL)
+            self.cancel_btn.config(state=DISABLED)
+            self.timings_btn.config(state=NORMAL)
+            if self.sink.records:
+                self.save_btn.config(state=NORMAL)
+        else:
+            self.root.after(POLL_INTERVAL_MS, self.poll_queue)
+    
+    def show_output(self, text):
+        """Append text to the output view, keeping only the last OUTPUT_VIEW_LINES lines"""
+        with self.engine.timings.phase('display') as sample:
+            sample['bytes'] = len(text)
+            lines = text.split("\n")
+            if len(lines) > OUTPUT_VIEW_LINES:
+                text = "\n".join(lines[-OUTPUT_VIEW_LINES:])
+            self.output_text.insert(END, text)
             
-            # Calculate new scroll height
-            new_height = self.driver.execute_script("return document.body.scrollHeight")
-            if new_height == last_height:
-                self.status_var.set(f"Stopped scrolling - no new content (iteration {i})")
-                break
-            last_height = new_height
-        
-        self.process_page_content("\n=== SCROLLED CONTENT ===\n")
+            line_count = int(self.output_text.index('end-1c').split('.')[0])
+            if line_count > OUTPUT_VIEW_LINES:
+                self.output_text.delete(1.0, f"{line_count - OUTPUT_VIEW_LINES + 1}.0")
+            self.output_text.see(END)
     
-    def process_page_content(self, prefix=""):
-        """Extract and display structured content from current page"""
-        soup = BeautifulSoup(self.driver.page_source, 'html.parser')
-
-        # Remove unwanted elements
-        for tag in soup(['script', 'style', 'noscript', 'meta', 'link', 'svg']):
-            tag.decompose()
-
-        output_lines = [prefix] if prefix else []
-
-        # Example structure: H1-H6, Paragraphs, and Links
-        for tag in soup.find_all(['h1', 'h2', 'h3', 'p', 'a']):
-            text = tag.get_text(strip=True)
-            if not text:
-                continue
-            if tag.name.startswith('h'):
-                level = int(tag.name[1])
-                output_lines.append(f"{'#' * level} {text}")
-            elif tag.name == 'p':
-                output_lines.append(f"\n{text}\n")
-            elif tag.name == 'a':
-                href = tag.get('href')
-                output_lines.append(f"[{text}]({href})")
-
-        structured_text = '\n'.join(output_lines)
-        self.scraped_data += structured_text + "\n"
-        self.output_text.insert(END, structured_text + "\n")
-        self.output_text.see(END)
-        self.root.update()
+    def set_status(self, text):
+        """Send a status bar update from the worker thread"""
+        self.ui_queue.put(('status', text))
+    
+    def append_output(self, structured_text, label="", url=None):
+        """Stream extracted text to the sink and queue it for the output view"""
+        with self.engine.timings.phase('output', url):
+            self.sink.write(structured_text, label, url)
+        prefix = f"\n=== {label} ===\n\n" if label else ""
+        self.ui_queue.put(('output', prefix + structured_text + "\n"))
 
     
     def save_results(self):
         """Save scraped content to a file"""
-        if not self.scraped_data.strip():
+        if not self.sink or not self.sink.records:
             messagebox.showwarning("Warning", "No content to save")
             return
             
+        description, extension = OutputSink.FORMATS[self.sink.format]
         file_path = filedialog.asksaveasfilename(
-            defaultextension=".txt",
-            filetypes=[("Text Files", "*.txt"), ("All Files", "*.*")],
+            defaultextension=extension,
+            filetypes=[(description, f"*{extension}"), ("All Files", "*.*")],
             title="Save Scraped Content"
         )
         
         if file_path:
             try:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(self.scraped_data)
+                self.sink.save_to(file_path)
                 messagebox.showinfo("Success", f"Content saved to:\n{file_path}")
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to save file:\n{str(e)}")
+    
+    def save_timing_report(self):
+        """Save the last job's phase timings, and its profile if enabled, as JSON"""
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            filetypes=[("JSON Files", "*.json"), ("All Files", "*.*")],
+            title="Save Timing Report"
+        )
+        if not file_path:
+            return
+        
+        report = timing_report(self.engine.timings, self.engine.profilers, url=self.job['url'], mode=self.job['type'],
+                               engine=self.job['engine'], summary=self.status_var.get())
+        try:
+            with open(file_path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            messagebox.showinfo("Success", f"Timing report saved to:\n{file_path}")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to save file:\n{str(e)}")
+    
+    def on_close(self):
+        """Quit any open browsers before closing the window"""
+        if self.worker and self.worker.is_alive():
+            self.cancel_event.set()
+            self.worker.join(timeout=15)
+        self.engine.close()
+        if self.sink:
+            self.sink.close()
+            self.sink = None
+        self.root.destroy()
+
+def read_url_list(path):
+    """Read one URL per line, skipping blank lines and # comments"""
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+
+def scrape_url(index, job, shared, verbose=False, profilers=None, write_page=None):
+    """Scrape one URL of a batch and return its result record
+
+    The record lists the extracted pages, or with write_page only counts them and
+    each page is passed to write_page as its own record as soon as it is extracted.
+    With profiling on, the job's cProfile data is appended to profilers as one
+    list per URL.
+    """
+    pages = []
+
+    def on_output(content, label, url):
+        if write_page:
+            write_page({'index': index, 'start_url': job['url'], 'label': label, 'url': url, 'content': content})
+            pages.append(None)
+        else:
+            pages.append({'label': label, 'url': url, 'content': content})
+
+    on_status = (lambda text: print(f"[{index}] {text}", file=sys.stderr)) if verbose else None
+    engine = ScrapeEngine(on_status=on_status, on_output=on_output, **shared)
+    record = {'index': index, 'url': job['url'], 'mode': job['type']}
+    start = time.perf_counter()
+    try:
+        record['summary'] = engine.run(job)
+        if engine.profilers and profilers is not None:
+            profilers.append(engine.profilers)
+        record['ok'] = engine.failed_pages == 0
+        record['failed_pages'] = engine.failed_pages
+    except JobCancelled:
+        record['ok'] = False
+        record['error'] = "cancelled"
+    except Exception as e:
+        record['ok'] = False
+        record['error'] = str(e)
+    finally:
+        engine.close()
+    record['seconds'] = round(time.perf_counter() - start, 3)
+    record['pages'] = len(pages) if write_page else pages
+    return record
+
+
+def run_batch(args):
+    """Scrape every URL in the list file and write one JSON record per URL
+
+    Crawls can return many pages, so in crawl mode every page is written as its
+    own record when it is extracted, and the URL's record only counts them.
+    """
+    try:
+        urls = read_url_list(args.urls)
+    except OSError as e:
+        print(f"Cannot read URL list: {e}", file=sys.stderr)
+        return 2
+    if not urls:
+        print("The URL list is empty", file=sys.stderr)
+        return 2
+
+    settings = {
+        'type': args.mode,
+        'engine': args.engine,
+        'load_profile': args.load_profile,
+        'extractor': args.extractor,
+        'pages': args.pages,
+        'workers': args.browsers,
+        'pagination': args.pagination,
+        'next_selector': args.next_selector,
+        'stop_when_stale': args.stop_when_stale,
+        'max_depth': args.max_depth,
+        'concurrency': args.concurrency,
+        'per_host': args.per_host,
+        'crawl_delay': args.crawl_delay,
+        'robots': not args.ignore_robots,
+        'scrolls': args.scrolls,
+        'wait_time': args.wait,
+        'incremental': not args.full_scroll_parse,
+        'adaptive_wait': not args.fixed_wait,
+        'use_cache': not args.no_cache,
+        'cache_ttl': args.cache_ttl * 60,
+        'profile': args.profile,
+    }
+
+    # Browsers, connections and the cache are shared by all URLs in the batch
+    cancel_event = threading.Event()
+    phase_timings = PhaseTimings()
+    shared = {
+        'cancel_event': cancel_event,
+        'driver_pool': DriverPool(args.browsers, profile=args.load_profile, timings=phase_timings,
+                                  network_log=True if args.profile or args.timings else None),
+        'static_fetcher': StaticFetcher(pool_size=max(10, args.parallel), timings=phase_timings),
+        'page_cache': None if args.no_cache else PageCache(ttl=args.cache_ttl * 60),
+    }
+
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    out_lock = threading.Lock()
+
+    def write_record(record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with out_lock:
+            out.write(line)
+            out.flush()
+
+    write_page = write_record if args.mode == "crawl" else None
+    records = []
+    profilers = []
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=args.parallel) as executor:
+            futures = [executor.submit(scrape_url, index, make_job(url, **settings), shared, args.verbose, profilers,
+                                       write_page)
+                       for index, url in enumerate(urls)]
+            try:
+                for future in as_completed(futures):
+                    record = future.result()
+                    records.append(record)
+                    write_record(record)
+            except KeyboardInterrupt:
+                cancel_event.set()
+                for future in futures:
+                    future.cancel()
+                raise
+    except KeyboardInterrupt:
+        print("Interrupted", file=sys.stderr)
+        return 130
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        shared['driver_pool'].close()
+        shared['static_fetcher'].close()
+        if shared['page_cache']:
+            shared['page_cache'].close()
+
+    # Per-URL timing summary
+    elapsed = time.perf_counter() - start
+    failed = [record for record in records if not record['ok']]
+    for record in sorted(records, key=lambda r: r['index']):
+        status = "ok" if record['ok'] else "FAIL"
+        if record.get('error'):
+            error = f"  ({record['error']})"
+        elif record.get('failed_pages'):
+            error = f"  ({record['failed_pages']} failed page(s))"
+        else:
+            error = ""
+        print(f"{status:5} {record['seconds']:8.2f}s  {record['url']}{error}", file=sys.stderr)
+    timings = [record['seconds'] for record in records]
+    print(f"{len(records)} URLs: {len(records) - len(failed)} ok, {len(failed)} failed in {elapsed:.2f}s "
+          f"(mean {sum(timings) / len(timings):.2f}s, max {max(timings):.2f}s)", file=sys.stderr)
+    if shared['page_cache']:
+        print(shared['page_cache'].stats(), file=sys.stderr)
+    if shared['driver_pool'].network.pages:
+        print(f"{args.load_profile} {shared['driver_pool'].network}", file=sys.stderr)
+    print(phase_timings, file=sys.stderr)
+    
+    if args.profile and len(profilers) < len(records):
+        print(f"Profiled {len(profilers)} of {len(records)} URLs; this Python allows one profiler at a time, "
+              "use --parallel 1 to profile every URL", file=sys.stderr)
+    profiled = [profiler for url_profilers in profilers for profiler in url_profilers]
+    if args.timings:
+        report = timing_report(phase_timings, profiled, mode=args.mode, engine=args.engine, urls=len(records),
+                               failed=len(failed), seconds=round(elapsed, 3))
+        try:
+            with open(args.timings, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+        except OSError as e:
+            print(f"Cannot write timing report: {e}", file=sys.stderr)
+            return 2
+    elif profiled:
+        import pstats
+
+        pstats.Stats(*profiled, stream=sys.stderr).sort_stats('cumulative').print_stats(15)
+    return 1 if failed else 0
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description="Scrape a list of URLs without the GUI, writing one JSON record per URL "
+                    "(in crawl mode also one record per crawled page, written as it is extracted).",
+        epilog="Run without arguments to open the Advanced Web Scraper window.",
+    )
+    parser.add_argument('--urls', required=True, help="file with one URL per line")
+    parser.add_argument('--mode', choices=["single", "multi", "scroll", "crawl"], default="single",
+                        help="how to scrape each URL (default: single)")
+    parser.add_argument('--output', help="JSON Lines output file (default: stdout)")
+    parser.add_argument('--parallel', type=int, default=4, help="URLs scraped at the same time (default: 4)")
+    parser.add_argument('--browsers', type=int, default=4, help="size of the shared browser pool (default: 4)")
+    parser.add_argument('--engine', choices=["browser", "static"], default="browser",
+                        help="fetch with Chrome, or plain HTTP with browser fallback (default: browser)")
+    parser.add_argument('--load-profile', choices=list(LOAD_PROFILES), default=DEFAULT_LOAD_PROFILE,
+                        help="what the browser downloads per page: everything, no images/fonts/media/trackers, "
+                             "or also no stylesheets; lean and minimal return at DOMContentLoaded and can miss "
+                             "content added later, and report network stats, which other profiles only log "
+                             f"with --profile or --timings (default: {DEFAULT_LOAD_PROFILE})")
+    parser.add_argument('--extractor', choices=list(EXTRACTION_BACKENDS), default=None,
+                        help=f"HTML extraction backend (default: {DEFAULT_EXTRACTION_BACKEND})")
+    parser.add_argument('--pages', type=int, default=DEFAULT_JOB['pages'],
+                        help="max pages per URL in multi and crawl mode")
+    parser.add_argument('--pagination', choices=list(Paginator.STRATEGIES), default="query",
+                        help="how multi mode finds the next page (default: query)")
+    parser.add_argument('--next-selector', help="CSS selector of the next link for --pagination selector")
+    parser.add_argument('--stop-when-stale', action='store_true',
+                        help="in multi mode, stop at a page whose lines all appeared on earlier pages")
+    parser.add_argument('--max-depth', type=int, default=DEFAULT_JOB['max_depth'],
+                        help=f"links to follow from the start page in crawl mode (default: {DEFAULT_JOB['max_depth']})")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_JOB['concurrency'],
+                        help=f"pages loading at once per URL in crawl mode (default: {DEFAULT_JOB['concurrency']})")
+    parser.add_argument('--per-host', type=int, default=DEFAULT_JOB['per_host'],
+                        help=f"pages loading at once from one host in crawl mode (default: {DEFAULT_JOB['per_host']})")
+    parser.add_argument('--crawl-delay', type=float, default=DEFAULT_JOB['crawl_delay'],
+                        help="min seconds between fetches from one host; a longer robots.txt Crawl-delay wins "
+                             f"(default: {DEFAULT_JOB['crawl_delay']})")
+    parser.add_argument('--ignore-robots', action='store_true', help="crawl pages robots.txt disallows")
+    parser.add_argument('--scrolls', type=int, default=DEFAULT_JOB['scrolls'], help="scroll iterations in scroll mode")
+    parser.add_argument('--wait', type=float, default=DEFAULT_JOB['wait_time'], help="max seconds to wait per scroll")
+    parser.add_argument('--fixed-wait', action='store_true', help="always wait the full --wait after each scroll")
+    parser.add_argument('--full-scroll-parse', action='store_true',
+                        help="parse the page once after scrolling instead of incrementally")
+    parser.add_argument('--no-cache', action='store_true', help="do not use the on-disk page cache")
+    parser.add_argument('--cache-ttl', type=float, default=DEFAULT_JOB['cache_ttl'] / 60,
+                        help="minutes a cached page is used without revalidation (default: 60)")
+    parser.add_argument('--timings', help="write per-phase and per-page timings to this JSON file")
+    parser.add_argument('--profile', action='store_true',
+                        help="profile each URL with cProfile, including its fetches on browser pool and crawl "
+                             "threads; the top functions go into the --timings report, or to stderr without one")
+    parser.add_argument('--verbose', action='store_true', help="print progress messages to stderr")
+    args = parser.parse_args(argv)
+
+    for name in ('parallel', 'browsers', 'pages', 'scrolls', 'concurrency', 'per_host'):
+        if getattr(args, name) < 1:
+            parser.error(f"--{name.replace('_', '-')} must be at least 1")
+    if args.max_depth < 0:
+        parser.error("--max-depth must not be negative")
+    if args.crawl_delay < 0:
+        parser.error("--crawl-delay must not be negative")
+    if args.wait < 0.5:
+        parser.error("--wait must be at least 0.5")
+    if args.cache_ttl < 0:
+        parser.error("--cache-ttl must not be negative")
+    if args.pagination == "selector" and not args.next_selector:
+        parser.error("--pagination selector needs --next-selector")
+    return args
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        return run_batch(parse_args(argv))
 
-if __name__ == "__main__":
     root = Tk()
     app = AdvancedWebScraper(root)
-    root.mainloop()
\ No newline at end of file
+    root.mainloop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import scraper
+
+
+STATIC_PAGE = (
+    "<html><head><title>Article</title></head><body><h1>An article</h1>"
+    + "<p>Server-rendered paragraph with plenty of readable text in it.</p>" * 10
+    + "</body></html>"
+)
+SPA_PAGE = (
+    '<html><head><title>App</title></head><body><div id="root"></div>'
+    '<script src="/static/js/main.js"></script></body></html>'
+)
+SCRIPT_HEAVY_PAGE = (
+    "<html><body><p>Loading</p><script>" + "window.state = {};" * 100 + "</script></body></html>"
+)
+PAGES = {'/static': STATIC_PAGE, '/spa': SPA_PAGE, '/scripted': SCRIPT_HEAVY_PAGE}
+# A listing without any <p>: every item is a heading and a link
+for number in range(1, 4):
+    PAGES[f'/list?page={number}'] = (
+        f"<html><body><h1>Listing page {number}</h1>"
+        + ''.join(f'<h2>Item {number}-{item}</h2><a href="/item/{number}-{item}">Details</a>'
+                  for item in range(5))
+        + "</body></html>"
+    )
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path not in PAGES:
+            self.send_error(404)
+            return
+        body = PAGES[self.path].encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope='module')
+def base_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def fetcher():
+    fetcher = scraper.StaticFetcher()
+    yield fetcher
+    fetcher.close()
+
+
+def test_static_page_stays_on_static_path(base_url, fetcher):
+    page = fetcher.fetch_if_static(base_url + '/static')
+    assert page is not None
+    assert page.source == 'static'
+    assert "An article" in page.html
+
+
+@pytest.mark.parametrize('path', ['/spa', '/scripted'])
+def test_js_rendered_page_needs_browser(base_url, fetcher, path):
+    assert fetcher.fetch_if_static(base_url + path) is None
+
+
+def test_load_page_falls_back_to_browser_only_when_needed(base_url, fetcher):
+    browser_urls = []
+
+    def browser_fetch(url):
+        browser_urls.append(url)
+        return STATIC_PAGE
+
+    static = scraper.load_page(base_url + '/static', browser_fetch, fetcher)
+    assert static.source == 'static'
+    assert browser_urls == []
+
+    rendered = scraper.load_page(base_url + '/spa', browser_fetch, fetcher)
+    assert rendered.source == 'browser'
+    assert browser_urls == [base_url + '/spa']
+
+
+def test_multi_page_scrape_keeps_pages_without_paragraphs(base_url, fetcher):
+    outputs = []
+    engine = scraper.ScrapeEngine(on_output=lambda content, label, url: outputs.append((label, content)),
+                                  static_fetcher=fetcher)
+    try:
+        engine.run(scraper.make_job(base_url + '/list', type="multi", engine="static", pages=3, use_cache=False))
+    finally:
+        engine.close()
+    assert [label for label, _ in outputs] == ["PAGE 1", "PAGE 2", "PAGE 3"]
+    assert "# Listing page 1" in outputs[0][1]
+    assert engine.pagination_stop is None
+
+
+class FakeDriver:
+    def __init__(self):
+        self.quit_called = False
+
+    def quit(self):
+        self.quit_called = True
+
+
+class FakeDriverPool(scraper.DriverPool):
+    def _create_driver(self):
+        return FakeDriver()
+
+
+def test_driver_pool_replaces_broken_driver_for_waiting_caller():
+    pool = FakeDriverPool(size=1)
+    driver = pool.acquire()
+    waiter = ThreadPoolExecutor(max_workers=1)
+    try:
+        replacement = waiter.submit(pool.acquire)
+        pool.release(driver, broken=True)
+        assert replacement.result(timeout=5) is not driver
+        assert driver.quit_called
+    finally:
+        waiter.shutdown()
+        pool.close()
+
+
+def test_driver_pool_quits_drivers_returned_after_close():
+    pool = FakeDriverPool(size=2)
+    busy = pool.acquire()
+    idle = pool.acquire()
+    pool.release(idle)
+    pool.close()
+    assert idle.quit_called
+    assert not busy.quit_called
+    pool.release(busy)
+    assert busy.quit_called
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+
+
+def test_stream_extractor_decodes_character_references_like_bs4():
+    html = ("<h1>Caf&#233; &#x2603; &#X41;</h1><p>&#128;uro &#0; &#xD800; &#150;&#151;</p>"
+            "<a href='/x'>&#65x &amp; &#38;copy; &notanentity</a>")
+    assert scraper.extract_with_stream(html) == scraper.extract_with_bs4(html)